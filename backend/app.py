@@ -5,17 +5,36 @@ Flask REST API with React frontend support
 
 from flask import Flask, send_from_directory
 from flask_cors import CORS
-from config import Config
+from dotenv import load_dotenv
 import os
 
-def create_app(config_class=Config):
+def create_app(config_class=None):
     """Application factory pattern"""
+    # .env must be loaded before Config reads the environment
+    load_dotenv()
+    if config_class is None:
+        from config import Config
+        config_class = Config
+    
     app = Flask(__name__, static_folder='../frontend/build', static_url_path='')
     app.config.from_object(config_class)
     
     # Enable CORS for development
     CORS(app, resources={r"/api/*": {"origins": "*"}})
     
+    # Select the database (and create/migrate SQLite) now rather than at import;
+    # one database session (connection + transaction) per request
+    import db
+    db.init_app(app)
+    
+    # Query count/time per request (X-Query-Count, Server-Timing) and N+1 warnings
+    import query_log
+    query_log.init_app(app)
+    
+    # Background rescoring of the trending sort, one thread per worker
+    import trending
+    trending.init_app(app)
+    
     # Register API blueprints
     from routes.auth import auth_bp
     from routes.posts import posts_bp
@@ -3,18 +3,28 @@ JWT Authentication Middleware
 Provides token generation and validation for API authentication
 """
 
+import hashlib
 import jwt
 import os
+import threading
+import time
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify
+from flask import current_app, request, jsonify
+from cache import TTLCache, MISSING, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL
 from models.user import User
+from db import reading_from_primary
 
 # Secret key for JWT
 SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24 * 7  # 7 days
 
+# Verified token payloads by token digest, and revoked digests -> exp
+_verified_tokens = TTLCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL, name='tokens')
+_revoked = {}
+_revoked_lock = threading.Lock()
+
 
 def generate_token(user_id):
     """Generate JWT token for a user"""
@@ -27,51 +37,109 @@ def generate_token(user_id):
     return token
 
 
-def decode_token(token):
-    """Decode and validate JWT token"""
+def _verify(token):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        return payload
+        return jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         return None  # Token expired
     except jwt.InvalidTokenError:
         return None  # Invalid token
 
 
+def _digest(token):
+    # Cache keys are digests so raw bearer tokens are never kept in memory
+    if isinstance(token, str):
+        token = token.encode()
+    return hashlib.sha256(token).digest()
+
+
+def decode_token(token):
+    """
+    Decode and validate JWT token. Verified payloads are cached per token
+    until the token's exp (at most TOKEN_CACHE_TTL), so repeated requests
+    skip signature verification; revoked tokens are always rejected.
+    """
+    digest = _digest(token)
+    if digest in _revoked:
+        return None
+    
+    payload = _verified_tokens.get(digest)
+    if payload is not MISSING:
+        return payload
+    
+    payload = _verify(token)
+    if payload is not None:
+        exp = payload.get('exp')
+        _verified_tokens.set(digest, payload, ttl=exp - time.time() if exp is not None else None)
+    return payload
+
+
+def revoke_token(token):
+    """Reject a still-valid token from now on (in this worker process)"""
+    payload = _verify(token)
+    if payload is None:
+        return
+    digest = _digest(token)
+    now = time.time()
+    with _revoked_lock:
+        # Forget revocations of tokens that have expired anyway
+        for key in [key for key, exp in _revoked.items() if exp <= now]:
+            del _revoked[key]
+        _revoked[digest] = payload.get('exp', now + JWT_EXPIRATION_HOURS * 3600)
+    _verified_tokens.invalidate(digest)
+
+
+def _bearer_token():
+    """
+    Token of an 'Authorization: Bearer <token>' header.
+    Returns None without a header and '' for a malformed one.
+    """
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return None
+    _, separator, token = auth_header.partition(' ')
+    return token.strip() if separator else ''
+
+
+def _authenticate():
+    """
+    Resolve the request's bearer token to a user and attach it to the
+    request. Returns (user, None) or (None, error response).
+    """
+    token = _bearer_token()
+    if token == '':
+        return None, (jsonify({'error': 'Invalid token format'}), 401)
+    if not token:
+        return None, (jsonify({'error': 'Authentication token required'}), 401)
+    
+    # Decode token
+    payload = decode_token(token)
+    if not payload:
+        return None, (jsonify({'error': 'Invalid or expired token'}), 401)
+    
+    # Get user (served from the user cache on most requests). A replica may
+    # not have a just-registered user yet, and a miss here logs the client out.
+    with reading_from_primary():
+        user = User.get_by_id(payload['user_id'])
+    if not user:
+        return None, (jsonify({'error': 'User not found'}), 401)
+    
+    # Attach user info to request for simpler access
+    request.user_id = user.id
+    request.current_user = user
+    return user, None
+
+
 def token_required(f):
     """Decorator to protect routes with JWT authentication"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        # Get token from Authorization header
-        auth_header = request.headers.get('Authorization')
-        if auth_header:
-            try:
-                # Expected format: "Bearer <token>"
-                token = auth_header.split(' ')[1]
-            except IndexError:
-                return jsonify({'error': 'Invalid token format'}), 401
-        
-        if not token:
-            return jsonify({'error': 'Authentication token required'}), 401
-        
-        # Decode token
-        payload = decode_token(token)
-        if not payload:
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
-        # Get user from database
-        user = User.get_by_id(payload['user_id'])
-        if not user:
-            return jsonify({'error': 'User not found'}), 401
-        
-        # Attach user_id to request for simpler access
-        request.user_id = user.id
-        request.current_user = user
+        user, error = _authenticate()
+        if error:
+            return error
         
-        # Pass user to route function
-        return f(current_user=user, *args, **kwargs)
+        # Pass user to route function (ensure_sync also runs async views)
+        return current_app.ensure_sync(f)(current_user=user, *args, **kwargs)
     
     return decorated
 
@@ -80,51 +148,23 @@ def require_auth(f):
     """Alternative decorator - attaches user info to request object"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
+        user, error = _authenticate()
+        if error:
+            return error
         
-        # Get token from Authorization header
-        auth_header = request.headers.get('Authorization')
-        if auth_header:
-            try:
-                token = auth_header.split(' ')[1]
-            except IndexError:
-                return jsonify({'error': 'Invalid token format'}), 401
-        
-        if not token:
-            return jsonify({'error': 'Authentication token required'}), 401
-        
-        # Decode token
-        payload = decode_token(token)
-        if not payload:
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
-        # Get user from database
-        user = User.get_by_id(payload['user_id'])
-        if not user:
-            return jsonify({'error': 'User not found'}), 401
-        
-        # Attach user info to request
-        request.user_id = user.id
-        request.current_user = user
-        
-        # Call the route function
-        return f(*args, **kwargs)
+        # Call the route function (ensure_sync also runs async views)
+        return current_app.ensure_sync(f)(*args, **kwargs)
     
     return decorated
 
 
 def get_current_user():
     """Get current user from request token (optional)"""
-    auth_header = request.headers.get('Authorization')
-    if not auth_header:
+    token = _bearer_token()
+    if not token:
         return None
     
-    try:
-        token = auth_header.split(' ')[1]
-        payload = decode_token(token)
-        if payload:
-            return User.get_by_id(payload['user_id'])
-    except:
-        pass
-    
+    payload = decode_token(token)
+    if payload:
+        return User.get_by_id(payload['user_id'])
     return None
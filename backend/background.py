@@ -0,0 +1,32 @@
+"""
+Per-process background threads
+view_counts and trending each run one daemon thread per worker process.
+ProcessThread starts it on first use rather than at import, so a
+pre-forking server's master doesn't own the thread, and starts it again in a
+child after fork() (threads don't survive the fork; the object does).
+"""
+
+import os
+import threading
+
+
+class ProcessThread:
+    """A daemon thread running `target`, started at most once per process"""
+
+    def __init__(self, target, name):
+        self.target = target
+        self.name = name
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the thread unless this process already has it running"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            # A thread seen here after fork() belongs to the parent
+            if self._thread is None or self._pid != os.getpid():
+                self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
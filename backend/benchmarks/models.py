@@ -0,0 +1,120 @@
+"""
+Model construction microbenchmark
+Builds Post objects from tuple-backed rows the way the models used to (a
+__dict__ per object, strptime for every timestamp) and the way they do now
+(__slots__, a loader compiled per row layout, fromisoformat), and reports
+CPU per row and memory per object.
+
+    python benchmarks/models.py [--rows 10000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import row_class  # noqa: E402
+from models.post import Post  # noqa: E402
+
+FIELDS = ('id', 'title', 'content', 'subject', 'user_id', 'is_question', 'is_answered',
+          'best_answer_id', 'is_pinned', 'is_deleted', 'view_count', 'upvotes',
+          'downvotes', 'timestamp', 'edited_at')
+
+
+def _parse_timestamp(value):
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            pass
+    return value
+
+
+class DictPost:
+    """The previous Post layout: attributes in a per-object __dict__"""
+
+    def __init__(self, id=None, user_id=None, title=None, content=None,
+                 subject=None, timestamp=None, edited_at=None, view_count=0,
+                 upvotes=0, downvotes=0, author=None, **kwargs):
+        self.id = id
+        self.user_id = user_id
+        self.title = title
+        self.content = content
+        self.subject = subject
+        self.timestamp = timestamp
+        self.edited_at = edited_at
+        self.view_count = view_count
+        self.upvotes = upvotes
+        self.downvotes = downvotes
+        self._author = author
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    @staticmethod
+    def from_row(row):
+        post = DictPost()
+        post.__dict__.update(zip(row._fields, row))
+        post.timestamp = _parse_timestamp(post.timestamp)
+        post.edited_at = _parse_timestamp(post.edited_at)
+        return post
+
+
+def make_rows(count):
+    Row = row_class(FIELDS)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        stamp = (start + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S')
+        edited = stamp if i % 4 == 0 else None
+        rows.append(Row((i, f'Post title {i}', 'Some content ' * 20, 'Coding', i % 500,
+                         0, 0, None, 0, 0, i % 97, i % 13, i % 3, stamp, edited)))
+    return rows
+
+
+def per_row_us(from_row, rows, repeat):
+    timer = timeit.Timer(lambda: [from_row(row) for row in rows])
+    best = min(timer.repeat(repeat=repeat, number=1))
+    return best / len(rows) * 1e6
+
+
+def bytes_per_object(from_row, rows):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [from_row(row) for row in rows]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # Attribute values are shared with the rows except decoded timestamps
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del objects
+    return total / len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    old, new = DictPost.from_row(rows[0]), Post.from_row(rows[0])
+    assert old.timestamp == new.timestamp and old.title == new.title
+
+    results = []
+    for label, from_row in (('dict + strptime (before)', DictPost.from_row),
+                            ('slots + fromisoformat (after)', Post.from_row)):
+        results.append((label, per_row_us(from_row, rows, args.repeat),
+                        bytes_per_object(from_row, rows)))
+
+    print(f"{args.rows} rows, best of {args.repeat}")
+    for label, cpu, memory in results:
+        print(f"  {label:<32} {cpu:6.2f} us/row  {memory:7.0f} bytes/object")
+    (_, old_cpu, old_mem), (_, new_cpu, new_mem) = results
+    print(f"  speedup {old_cpu / new_cpu:.1f}x, memory {new_mem / old_mem:.0%} of before")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Post search benchmark
+Builds a synthetic corpus of posts in a throwaway SQLite database (migrated
+like any other, so the FTS5 index is filled by its triggers) and compares
+the latency of a first search page through the old `LIKE '%term%'` filter
+and through Post.get_all, which uses the full-text index.
+
+    python benchmarks/search.py [--rows 1000000] [--repeat 5] [--seed 1]
+
+Building the default 1M-post corpus takes a few minutes and about 1 GB of
+disk; use --rows for a quicker run.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SUBJECTS = ['Coding', 'Studies', 'General Discussion', 'Placement', 'Projects']
+VOCABULARY_SIZE = 20000
+TITLE_WORDS = 8
+CONTENT_WORDS = 60
+USERS = 1000
+PAGE = 20
+
+# The query Post.get_all ran before the full-text index (keyset order kept,
+# so only the filter differs)
+LIKE_QUERY = """
+SELECT p.*, u.username AS author_username, u.name AS author_name
+FROM posts p
+LEFT JOIN users u ON u.id = p.user_id
+WHERE (p.title LIKE %s OR p.content LIKE %s) {subject}
+ORDER BY p.timestamp DESC, p.id DESC
+LIMIT %s
+"""
+
+
+def make_vocabulary(rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add(''.join(rng.choice(letters) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+
+def build_corpus(conn, rows, rng, vocabulary):
+    """Insert `rows` posts whose words follow a Zipf-like distribution"""
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT INTO users (username, name, email, password_hash) VALUES (?, ?, ?, 'x')",
+        [(f'user{i}', f'User {i}', f'user{i}@example.com') for i in range(USERS)])
+    batch = 10000
+    for start in range(0, rows, batch):
+        count = min(batch, rows - start)
+        words = rng.choices(vocabulary, weights, k=count * (TITLE_WORDS + CONTENT_WORDS))
+        posts = []
+        for i in range(count):
+            offset = i * (TITLE_WORDS + CONTENT_WORDS)
+            title = ' '.join(words[offset:offset + TITLE_WORDS])
+            content = ' '.join(words[offset + TITLE_WORDS:offset + TITLE_WORDS + CONTENT_WORDS])
+            posts.append((rng.randint(1, USERS), title, content, rng.choice(SUBJECTS),
+                          '2024-01-01 00:00:00'))
+        cursor.executemany(
+            "INSERT INTO posts (user_id, title, content, subject, timestamp) VALUES (?, ?, ?, ?, ?)",
+            posts)
+        conn.commit()
+        print(f"\r  {start + count:,} / {rows:,} posts", end='', flush=True)
+    print()
+    cursor.execute("ANALYZE")
+    conn.commit()
+
+
+def median_ms(func, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'forum.db')}"
+        os.environ['SLOW_QUERY_MS'] = '0'
+        os.environ.pop('DATABASE_REPLICA_URLS', None)
+        import db
+        from models.post import Post
+        db.configure()
+
+        print(f"Building {args.rows:,} posts...")
+        started = time.perf_counter()
+        with db.get_db_connection() as conn:
+            build_corpus(conn, args.rows, rng, vocabulary)
+        print(f"  built in {time.perf_counter() - started:.0f} s")
+
+        # Words are ranked by frequency in vocabulary order: the first is in
+        # nearly every post, the last in a few hundred of a million
+        cases = [
+            ('common word', vocabulary[0]),
+            ('mid-frequency word', vocabulary[1000]),
+            ('rare word', vocabulary[-1]),
+            ('no match', 'qqqqqqqqqqqq'),
+            ('prefix', vocabulary[50][:3]),
+            ('two letters', vocabulary[50][:2]),
+            ('one letter', vocabulary[50][:1]),
+            ('two words', f'{vocabulary[1]} {vocabulary[10]}'),
+            ('word + prefix', f'{vocabulary[0]} {vocabulary[10][:3]}'),
+        ]
+
+        def like(term, subject=None):
+            pattern = f'%{term}%'
+            params = [pattern, pattern] + ([subject] if subject else []) + [PAGE + 1]
+            query = LIKE_QUERY.format(subject='AND p.subject = %s' if subject else '')
+            return db.fetch_all(query, tuple(params), row_mode=db.ROWS_TUPLE)
+
+        print(f"\nFirst page ({PAGE} posts), median of {args.repeat} runs:")
+        print(f"  {'search':<24} {'LIKE':>10} {'FTS latest':>12} {'FTS relevance':>15}")
+        for label, term in cases:
+            # LIKE matches the phrase as typed; both words for the FTS paths
+            like_ms = median_ms(lambda: like(term), args.repeat)
+            latest_ms = median_ms(lambda: Post.get_all(search=term, sort_by='latest', limit=PAGE),
+                                  args.repeat)
+            relevance_ms = median_ms(lambda: Post.get_all(search=term, sort_by='relevance', limit=PAGE),
+                                     args.repeat)
+            print(f"  {label:<24} {like_ms:8.1f} ms {latest_ms:10.1f} ms {relevance_ms:13.1f} ms")
+
+        label, term = cases[2]
+        like_ms = median_ms(lambda: like(term, 'Coding'), args.repeat)
+        fts_ms = median_ms(lambda: Post.get_all(search=term, subject='Coding', sort_by='relevance',
+                                                limit=PAGE), args.repeat)
+        print(f"  {label + ' + subject':<24} {like_ms:8.1f} ms {'':>12} {fts_ms:13.1f} ms")
+        db.close_db_connection()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
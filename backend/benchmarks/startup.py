@@ -0,0 +1,103 @@
+"""
+Startup benchmark
+Measures how long a fresh worker takes to import the app (what gunicorn does
+for every recycled or newly scaled worker) using `python -X importtime`, and
+fails when the median exceeds the budget. It also checks that importing db
+on its own has no side effects.
+
+    python benchmarks/startup.py [--runs 5] [--budget-ms 500] [--top 15]
+
+Runs against a throwaway SQLite database in a temporary directory.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 500))
+
+
+def _run(code, workdir, importtime=False):
+    env = dict(os.environ,
+               PYTHONPATH=BACKEND_DIR,
+               PYTHONDONTWRITEBYTECODE='1',
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'forum.db')}")
+    env.pop('DATABASE_REPLICA_URLS', None)
+    args = [sys.executable]
+    if importtime:
+        args += ['-X', 'importtime']
+    args += ['-c', code]
+    started = time.perf_counter()
+    result = subprocess.run(args, cwd=workdir, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"'{code}' failed with exit code {result.returncode}")
+    return result, elapsed
+
+
+def parse_importtime(stderr):
+    """[(self_us, cumulative_us, depth, module)] from -X importtime output"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        module = name.lstrip()
+        depth = (len(name) - len(module) - 1) // 2
+        entries.append((int(self_us), int(cumulative_us), depth, module))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Importing db alone must not print, parse config or touch the disk
+        result, _ = _run('import db', workdir)
+        if result.stdout or os.listdir(workdir):
+            print("FAIL: importing db has side effects")
+            print(result.stdout)
+            print(os.listdir(workdir))
+            return 1
+
+        # First app import creates and migrates the database; not measured
+        _run('import app', workdir)
+
+        totals = []
+        walls = []
+        entries = []
+        for _ in range(args.runs):
+            result, wall = _run('import app', workdir, importtime=True)
+            entries = parse_importtime(result.stderr)
+            totals.append(sum(cum for _, cum, depth, _ in entries if depth == 0) / 1000)
+            walls.append(wall * 1000)
+
+    median = statistics.median(totals)
+    print(f"import app: median {median:.1f} ms of imports "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}); "
+          f"process wall time median {statistics.median(walls):.1f} ms over {args.runs} runs")
+
+    print(f"\nSlowest modules by self time (last run):")
+    for self_us, cumulative_us, _, module in sorted(entries, reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms self {cumulative_us / 1000:8.1f} ms cumulative  {module}")
+
+    if median > args.budget_ms:
+        print(f"\nFAIL: startup {median:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        return 1
+    print(f"\nOK: startup {median:.1f} ms within budget {args.budget_ms:.0f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,11 +10,22 @@ class Config:
     # Session configuration
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     
+    # Database (unset means a local SQLite file, see db.configure)
+    DATABASE_URL = os.environ.get('DATABASE_URL', '')
+    
     # AI Configuration
     AI_PROVIDER = os.environ.get('AI_PROVIDER', 'mock')  # 'mock', 'openai', 'gemini'
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
     AI_MODEL = os.environ.get('AI_MODEL', 'gpt-3.5-turbo')
     
+    # Query instrumentation: flag a statement repeated more than this many
+    # times in one request (N+1). Raise instead of warning when set to 1;
+    # unset means raise only when app.testing is on.
+    QUERY_N_PLUS_ONE_THRESHOLD = int(os.environ.get('QUERY_N_PLUS_ONE_THRESHOLD', 10))
+    QUERY_N_PLUS_ONE_RAISE = (os.environ['QUERY_N_PLUS_ONE_RAISE'] == '1'
+                              if 'QUERY_N_PLUS_ONE_RAISE' in os.environ else None)
+    
     # Pagination
     POSTS_PER_PAGE = 20
     COMMENTS_PER_PAGE = 50
+    MESSAGES_PER_PAGE = 100
@@ -0,0 +1,80 @@
+"""
+Asyncio-compatible database access
+Mirrors fetch_one/fetch_all/insert/update/delete from db.py. The blocking
+drivers run on a bounded thread pool, so an async Flask view can await its
+queries without blocking the event loop while it also waits on other I/O
+(e.g. the AI provider in routes/ai.py).
+
+Calls run in a copy of the caller's context, so inside a request they
+join its unit of work (committed or rolled back with the request) and its
+query stats, on the connection db.init_app checked out for the request.
+That connection runs one statement at a time, so queries of one request
+gain nothing from being gathered: await them in turn. Views that only
+query the database are faster written as plain synchronous views.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+
+DB_ASYNC_WORKERS = int(os.environ.get('DB_ASYNC_WORKERS', 8))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide database thread pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=DB_ASYNC_WORKERS,
+                                               thread_name_prefix='db-async')
+    return _executor
+
+
+def _reset_after_fork():
+    # Pool threads don't survive fork(); the child builds its own pool
+    global _executor
+    _executor = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+async def run(func, *args, **kwargs):
+    """Run a blocking callable (e.g. a model method) on the database thread pool"""
+    loop = asyncio.get_running_loop()
+    # Pool threads serve many requests: give them this request's connection
+    # rather than their own thread's (already checked out in async views)
+    db.join_session()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(), call)
+
+
+async def fetch_one(query, params=None, row_mode=db.ROWS_DICT):
+    return await run(db.fetch_one, query, params, row_mode=row_mode)
+
+
+async def fetch_all(query, params=None, row_mode=db.ROWS_DICT):
+    return await run(db.fetch_all, query, params, row_mode=row_mode)
+
+
+async def insert(query, params=None):
+    return await run(db.insert, query, params)
+
+
+async def update(query, params=None):
+    return await run(db.update, query, params)
+
+
+async def delete(query, params=None):
+    return await run(db.delete, query, params)
@@ -0,0 +1,10 @@
+"""
+Gunicorn settings, loaded automatically from the working directory
+(Procfile: `web: gunicorn app:app`)
+"""
+
+
+def worker_exit(server, worker):
+    """Write the worker's buffered post views before it goes away"""
+    import view_counts
+    view_counts.flush_on_exit()
@@ -5,7 +5,9 @@ Creates tables and default admin user
 
 import mysql.connector
 from werkzeug.security import generate_password_hash
-from db import DB_CONFIG, get_db_connection
+from dotenv import load_dotenv
+from db import get_db_connection
+import migrate
 import os
 
 def init_database():
@@ -50,8 +52,14 @@ def init_database():
                 1000
             ))
             
+            # The schema was rebuilt, so every migration applies again
+            cursor.execute("DROP TABLE IF EXISTS schema_version")
+            
             cursor.close()
             print("[OK] Default admin created: admin@forum.com / admin123")
+        
+        migrate.run()
+        print("[OK] Migrations applied")
             
         print("\n" + "="*60)
         print("Database initialization complete!")
@@ -63,6 +71,7 @@ def init_database():
 
 
 if __name__ == "__main__":
+    load_dotenv()
     confirm = input("This will DROP all existing tables and data. Continue? (yes/no): ")
     if confirm.lower() == 'yes':
         init_database()
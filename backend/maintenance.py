@@ -0,0 +1,103 @@
+"""
+Maintenance commands
+    python maintenance.py recount [--batch-size 5000]
+        Recompute the denormalized counters (posts.comment_count, the
+        users *_count columns and the vote counts of posts and comments)
+        from the rows they count and fix any that drifted. Runs in id-range
+        batches, one short transaction each, so it can run against a live
+        database.
+
+    python maintenance.py trending [--all]
+        Rescore the posts queued for the trending sort (see trending.py)
+        until the queue is empty, or every post with --all (e.g. after
+        changing the TRENDING_* weights).
+
+Cached users in running workers pick up repaired counts within
+USER_CACHE_TTL seconds.
+"""
+
+import argparse
+import sys
+
+from dotenv import load_dotenv
+
+# db and trending read their settings (TRENDING_*, DATABASE_URL, ...) when
+# imported, so .env must be loaded first
+load_dotenv()
+
+import db
+import trending
+
+# (table, counter column, COUNT(*) subquery correlated on <table>.id)
+COUNTERS = [
+    ('posts', 'comment_count',
+     "SELECT COUNT(*) FROM comments c WHERE c.post_id = posts.id"),
+    ('users', 'followers_count',
+     "SELECT COUNT(*) FROM user_follows f WHERE f.following_id = users.id"),
+    ('users', 'following_count',
+     "SELECT COUNT(*) FROM user_follows f WHERE f.follower_id = users.id"),
+    ('users', 'posts_count',
+     "SELECT COUNT(*) FROM posts p WHERE p.user_id = users.id"),
+    ('users', 'comments_count',
+     "SELECT COUNT(*) FROM comments c WHERE c.user_id = users.id"),
+    ('posts', 'upvotes',
+     "SELECT COUNT(*) FROM votes v WHERE v.post_id = posts.id AND v.vote_type = 1"),
+    ('posts', 'downvotes',
+     "SELECT COUNT(*) FROM votes v WHERE v.post_id = posts.id AND v.vote_type = -1"),
+    ('comments', 'upvotes',
+     "SELECT COUNT(*) FROM votes v WHERE v.comment_id = comments.id AND v.vote_type = 1"),
+    ('comments', 'downvotes',
+     "SELECT COUNT(*) FROM votes v WHERE v.comment_id = comments.id AND v.vote_type = -1"),
+]
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def recount(batch_size=DEFAULT_BATCH_SIZE):
+    """Repair every counter in COUNTERS; returns {'table.column': rows fixed}"""
+    fixed = {}
+    for table, column, count_query in COUNTERS:
+        bounds = db.fetch_one(f"SELECT MIN(id) AS low, MAX(id) AS high FROM {table}")
+        total = 0
+        if bounds and bounds['low'] is not None:
+            # Only rows that drifted are written
+            query = f"""
+            UPDATE {table} SET {column} = ({count_query})
+            WHERE id BETWEEN %s AND %s AND {column} <> ({count_query})
+            """
+            for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+                total += db.update(query, (start, start + batch_size - 1))
+        fixed[f"{table}.{column}"] = total
+        print(f"{table}.{column}: {total} row(s) fixed")
+    return fixed
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Forum maintenance commands")
+    commands = parser.add_subparsers(dest='command', required=True)
+    recount_parser = commands.add_parser('recount', help="repair denormalized counters")
+    recount_parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    trending_parser = commands.add_parser('trending', help="rescore posts for the trending sort")
+    trending_parser.add_argument('--all', action='store_true', help="rescore every post")
+    args = parser.parse_args(argv)
+
+    db.configure()
+    if args.command == 'recount':
+        fixed = recount(args.batch_size)
+        print(f"✅ {sum(fixed.values())} counter(s) repaired.")
+    elif args.command == 'trending':
+        if args.all:
+            scored = trending.refresh_all()
+        else:
+            scored = 0
+            while True:
+                batch = trending.refresh_pending()
+                scored += batch
+                if batch < trending.TRENDING_BATCH_SIZE:
+                    break
+        print(f"✅ {scored} post(s) rescored.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,215 @@
+"""
+Versioned schema migrations
+Migration files live in migrations/ and are applied in version order:
+    NNNN_description.sql          runs on both backends
+    NNNN_description.sqlite.sql   SQLite only
+    NNNN_description.mysql.sql    MySQL only
+Applied versions are recorded in the schema_version table, so each file runs
+once per database. SQLite databases are migrated on startup (see
+db.init_sqlite_db). For MySQL run:
+    python migrate.py            apply pending migrations
+    python migrate.py status     list applied and pending migrations
+
+On SQLite each migration runs in one transaction. MySQL commits DDL
+implicitly, so a MySQL migration that fails halfway must be finished by hand.
+"""
+
+import os
+import re
+import sqlite3
+import sys
+from collections import namedtuple
+
+import sql_dialect
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+Migration = namedtuple('Migration', ['version', 'name', 'path'])
+
+_FILENAME = re.compile(r'^(\d+)_(\w+?)(?:\.(sqlite|mysql))?\.sql$')
+_DELIMITER = re.compile(r'^\s*DELIMITER\s+(\S+)\s*$', re.IGNORECASE)
+
+_CREATE_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def discover(dialect, directory=MIGRATIONS_DIR):
+    """Migrations for `dialect`, ordered by version"""
+    found = {}
+    for filename in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version, name, only = int(match.group(1)), match.group(2), match.group(3)
+        if only and only != dialect:
+            continue
+        if version in found:
+            raise ValueError(f"Duplicate migration version {version:04d}: "
+                             f"{found[version].path} and {filename}")
+        found[version] = Migration(version, name, os.path.join(directory, filename))
+    return [found[version] for version in sorted(found)]
+
+
+def split_statements(sql, dialect):
+    """
+    Split a migration script into statements. SQLite statements end where
+    sqlite3.complete_statement says so (trigger bodies stay whole); MySQL
+    scripts may switch terminators with DELIMITER, as in the mysql client.
+    """
+    statements = []
+    buffer = []
+    delimiter = ';'
+    for line in sql.splitlines():
+        if dialect == sql_dialect.MYSQL:
+            match = _DELIMITER.match(line)
+            if match:
+                delimiter = match.group(1)
+                continue
+        buffer.append(line)
+        text = '\n'.join(buffer).strip()
+        if dialect == sql_dialect.SQLITE:
+            done = sqlite3.complete_statement(text)
+        else:
+            done = text.endswith(delimiter)
+            if done:
+                text = text[:-len(delimiter)]
+        if done:
+            if _has_sql(text):
+                statements.append(text.strip().rstrip(';'))
+            buffer = []
+    if _has_sql('\n'.join(buffer)):
+        statements.append('\n'.join(buffer).strip().rstrip(';'))
+    return statements
+
+
+def _has_sql(text):
+    return any(line.strip() and not line.strip().startswith('--') for line in text.splitlines())
+
+
+def applied_versions(conn):
+    """Versions recorded in schema_version (created if missing)"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(_CREATE_VERSION_TABLE)
+        cursor.execute("SELECT version FROM schema_version")
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def _apply_sqlite(conn, migration):
+    """Apply one migration atomically; returns False if another process already did"""
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    try:
+        # Take the write lock first so concurrent workers apply it only once
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT 1 FROM schema_version WHERE version = ?", (migration.version,))
+        if cursor.fetchone():
+            cursor.execute("ROLLBACK")
+            return False
+        with open(migration.path, 'r', encoding='utf-8') as f:
+            for statement in split_statements(f.read(), sql_dialect.SQLITE):
+                cursor.execute(statement)
+        cursor.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                       (migration.version, migration.name))
+        cursor.execute("COMMIT")
+        return True
+    except Exception:
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+    finally:
+        cursor.close()
+        conn.isolation_level = isolation_level
+
+
+def _apply_mysql(conn, migration):
+    cursor = conn.cursor()
+    try:
+        with open(migration.path, 'r', encoding='utf-8') as f:
+            for statement in split_statements(f.read(), sql_dialect.MYSQL):
+                cursor.execute(statement)
+        cursor.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s)",
+                       (migration.version, migration.name))
+        conn.commit()
+        return True
+    finally:
+        cursor.close()
+
+
+def migrate(conn, dialect, target=None):
+    """
+    Apply pending migrations up to `target` (default: all) on a raw DB-API
+    connection. Returns the migrations that were applied.
+    """
+    done = applied_versions(conn)
+    if dialect == sql_dialect.SQLITE and conn.in_transaction:
+        conn.commit()
+
+    applied = []
+    for migration in discover(dialect):
+        if migration.version in done or (target is not None and migration.version > target):
+            continue
+        print(f"Applying migration {migration.version:04d}_{migration.name}...")
+        apply = _apply_sqlite if dialect == sql_dialect.SQLITE else _apply_mysql
+        if apply(conn, migration):
+            applied.append(migration)
+    return applied
+
+
+def status(conn, dialect):
+    """[(migration, applied?)] for every migration of `dialect`"""
+    done = applied_versions(conn)
+    return [(migration, migration.version in done) for migration in discover(dialect)]
+
+
+def connect():
+    """A raw connection to the configured database (not part of any request session)"""
+    import db
+    db.configure()
+    if db.USE_SQLITE:
+        return sqlite3.connect(db.DB_NAME), sql_dialect.SQLITE
+    import mysql.connector
+    return mysql.connector.connect(**db.DB_CONFIG), sql_dialect.MYSQL
+
+
+def run(target=None):
+    """Apply pending migrations to the configured database"""
+    conn, dialect = connect()
+    try:
+        applied = migrate(conn, dialect, target)
+    finally:
+        conn.close()
+    print(f"✅ {len(applied)} migration(s) applied.")
+    return applied
+
+
+def main(argv):
+    command = argv[0] if argv else 'up'
+    if command == 'up':
+        run(int(argv[1]) if len(argv) > 1 else None)
+    elif command == 'status':
+        conn, dialect = connect()
+        try:
+            for migration, is_applied in status(conn, dialect):
+                mark = 'applied' if is_applied else 'pending'
+                print(f"{migration.version:04d}_{migration.name:<40} {mark}")
+        finally:
+            conn.close()
+    else:
+        print("Usage: python migrate.py [up [VERSION] | status]")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,38 @@
+-- Bring the SQLite messaging tables in line with schema_v2.sql (MySQL),
+-- which the Conversation and Message models are written against.
+-- SQLite can't add a column with a CURRENT_TIMESTAMP default, so the
+-- timestamps are filled by triggers instead.
+
+ALTER TABLE conversations ADD COLUMN type VARCHAR(20) DEFAULT 'direct';
+ALTER TABLE conversations ADD COLUMN name VARCHAR(200);
+ALTER TABLE conversations ADD COLUMN updated_at DATETIME;
+UPDATE conversations SET updated_at = COALESCE(last_message_at, created_at);
+
+CREATE TRIGGER IF NOT EXISTS conversations_updated_at_default
+AFTER INSERT ON conversations
+WHEN NEW.updated_at IS NULL
+BEGIN
+    UPDATE conversations SET updated_at = NEW.created_at WHERE id = NEW.id;
+END;
+
+ALTER TABLE messages ADD COLUMN created_at DATETIME;
+ALTER TABLE messages ADD COLUMN edited_at DATETIME;
+UPDATE messages SET created_at = timestamp;
+
+CREATE TRIGGER IF NOT EXISTS messages_created_at_default
+AFTER INSERT ON messages
+WHEN NEW.created_at IS NULL
+BEGIN
+    UPDATE messages SET created_at = NEW.timestamp WHERE id = NEW.id;
+END;
+
+CREATE TABLE IF NOT EXISTS message_reactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    emoji VARCHAR(10) NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (message_id) REFERENCES messages(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE (message_id, user_id, emoji)
+);
@@ -0,0 +1,8 @@
+-- schema_v2.sql already indexes posts(timestamp), posts(subject),
+-- comments(post_id), votes(user_id, post_id) and
+-- conversation_participants(user_id), and InnoDB indexes every foreign key
+-- (comments.parent_id included). Threads are read in order, so give the
+-- inbox and comment lists composite indexes.
+
+CREATE INDEX idx_messages_conversation_created ON messages (conversation_id, created_at);
+CREATE INDEX idx_comments_post_timestamp ON comments (post_id, timestamp);
@@ -0,0 +1,44 @@
+-- Secondary indexes for thread views, comment trees, vote lookups,
+-- listings and the inbox. schema_sqlite.sql declares none.
+
+CREATE INDEX IF NOT EXISTS idx_posts_timestamp ON posts (timestamp);
+CREATE INDEX IF NOT EXISTS idx_posts_subject ON posts (subject);
+CREATE INDEX IF NOT EXISTS idx_posts_user ON posts (user_id);
+
+CREATE INDEX IF NOT EXISTS idx_comments_post ON comments (post_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_comments_parent ON comments (parent_id);
+CREATE INDEX IF NOT EXISTS idx_comments_user ON comments (user_id);
+
+-- One vote per user and target, as on MySQL. Keep the newest vote where
+-- duplicates slipped in before the constraint existed, and recount the
+-- votes of the posts and comments that had them.
+CREATE TEMP TABLE duplicate_vote_targets AS
+SELECT DISTINCT post_id, comment_id FROM votes
+WHERE post_id IS NOT NULL
+  AND id NOT IN (SELECT MAX(id) FROM votes WHERE post_id IS NOT NULL GROUP BY user_id, post_id)
+UNION
+SELECT DISTINCT post_id, comment_id FROM votes
+WHERE comment_id IS NOT NULL
+  AND id NOT IN (SELECT MAX(id) FROM votes WHERE comment_id IS NOT NULL GROUP BY user_id, comment_id);
+DELETE FROM votes
+WHERE post_id IS NOT NULL
+  AND id NOT IN (SELECT MAX(id) FROM votes WHERE post_id IS NOT NULL GROUP BY user_id, post_id);
+DELETE FROM votes
+WHERE comment_id IS NOT NULL
+  AND id NOT IN (SELECT MAX(id) FROM votes WHERE comment_id IS NOT NULL GROUP BY user_id, comment_id);
+UPDATE posts
+SET upvotes = (SELECT COUNT(*) FROM votes v WHERE v.post_id = posts.id AND v.vote_type = 1),
+    downvotes = (SELECT COUNT(*) FROM votes v WHERE v.post_id = posts.id AND v.vote_type = -1)
+WHERE id IN (SELECT post_id FROM duplicate_vote_targets WHERE post_id IS NOT NULL);
+UPDATE comments
+SET upvotes = (SELECT COUNT(*) FROM votes v WHERE v.comment_id = comments.id AND v.vote_type = 1),
+    downvotes = (SELECT COUNT(*) FROM votes v WHERE v.comment_id = comments.id AND v.vote_type = -1)
+WHERE id IN (SELECT comment_id FROM duplicate_vote_targets WHERE comment_id IS NOT NULL);
+DROP TABLE duplicate_vote_targets;
+CREATE UNIQUE INDEX IF NOT EXISTS unique_post_vote ON votes (user_id, post_id);
+CREATE UNIQUE INDEX IF NOT EXISTS unique_comment_vote ON votes (user_id, comment_id);
+CREATE INDEX IF NOT EXISTS idx_votes_post ON votes (post_id);
+CREATE INDEX IF NOT EXISTS idx_votes_comment ON votes (comment_id);
+
+CREATE INDEX IF NOT EXISTS idx_participants_user ON conversation_participants (user_id);
+CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id, created_at);
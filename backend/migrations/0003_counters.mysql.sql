@@ -0,0 +1,18 @@
+-- Denormalized counters, kept up to date by the models in the same
+-- transaction as the write they count (see Post.create/delete,
+-- Comment.create/delete, User.follow/unfollow). Drift is repaired by
+-- `python maintenance.py recount`.
+
+ALTER TABLE posts ADD COLUMN comment_count INT NOT NULL DEFAULT 0;
+ALTER TABLE users
+    ADD COLUMN followers_count INT NOT NULL DEFAULT 0,
+    ADD COLUMN following_count INT NOT NULL DEFAULT 0,
+    ADD COLUMN posts_count INT NOT NULL DEFAULT 0,
+    ADD COLUMN comments_count INT NOT NULL DEFAULT 0;
+
+UPDATE posts SET comment_count = (SELECT COUNT(*) FROM comments c WHERE c.post_id = posts.id);
+UPDATE users SET
+    followers_count = (SELECT COUNT(*) FROM user_follows f WHERE f.following_id = users.id),
+    following_count = (SELECT COUNT(*) FROM user_follows f WHERE f.follower_id = users.id),
+    posts_count = (SELECT COUNT(*) FROM posts p WHERE p.user_id = users.id),
+    comments_count = (SELECT COUNT(*) FROM comments c WHERE c.user_id = users.id);
@@ -0,0 +1,20 @@
+-- Denormalized counters, kept up to date by the models in the same
+-- transaction as the write they count (see Post.create/delete,
+-- Comment.create/delete, User.follow/unfollow). Drift is repaired by
+-- `python maintenance.py recount`.
+
+ALTER TABLE posts ADD COLUMN comment_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE users ADD COLUMN followers_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE users ADD COLUMN following_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE users ADD COLUMN posts_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE users ADD COLUMN comments_count INTEGER NOT NULL DEFAULT 0;
+
+-- The primary key covers follower_id; recounting followers needs the other side
+CREATE INDEX IF NOT EXISTS idx_follows_following ON user_follows (following_id);
+
+UPDATE posts SET comment_count = (SELECT COUNT(*) FROM comments c WHERE c.post_id = posts.id);
+UPDATE users SET
+    followers_count = (SELECT COUNT(*) FROM user_follows f WHERE f.following_id = users.id),
+    following_count = (SELECT COUNT(*) FROM user_follows f WHERE f.follower_id = users.id),
+    posts_count = (SELECT COUNT(*) FROM posts p WHERE p.user_id = users.id),
+    comments_count = (SELECT COUNT(*) FROM comments c WHERE c.user_id = users.id);
@@ -0,0 +1,13 @@
+-- Keyset pagination of the post listing (see Post.get_all). Every sort
+-- orders by (key DESC, id DESC) and each key gets an index, alone and
+-- behind subject for the topic filter. InnoDB secondary indexes end with
+-- the primary key, so (key) already orders ties by id.
+
+ALTER TABLE posts
+    ADD COLUMN score INT AS (COALESCE(upvotes, 0) - COALESCE(downvotes, 0)) STORED,
+    ADD INDEX idx_posts_score (score),
+    ADD INDEX idx_posts_comment_count (comment_count),
+    ADD INDEX idx_posts_subject_timestamp (subject, timestamp),
+    ADD INDEX idx_posts_subject_score (subject, score),
+    ADD INDEX idx_posts_subject_comment_count (subject, comment_count),
+    DROP INDEX idx_subject;
@@ -0,0 +1,16 @@
+-- Keyset pagination of the post listing (see Post.get_all). Every sort
+-- orders by (key DESC, id DESC) and each key gets an index, alone and
+-- behind subject for the topic filter. Secondary indexes end with the
+-- rowid, so (key) already orders ties by id.
+
+ALTER TABLE posts ADD COLUMN score INTEGER
+    GENERATED ALWAYS AS (COALESCE(upvotes, 0) - COALESCE(downvotes, 0)) VIRTUAL;
+
+CREATE INDEX IF NOT EXISTS idx_posts_score ON posts (score);
+CREATE INDEX IF NOT EXISTS idx_posts_comment_count ON posts (comment_count);
+
+-- idx_posts_timestamp already covers `latest`
+CREATE INDEX IF NOT EXISTS idx_posts_subject_timestamp ON posts (subject, timestamp);
+CREATE INDEX IF NOT EXISTS idx_posts_subject_score ON posts (subject, score);
+CREATE INDEX IF NOT EXISTS idx_posts_subject_comment_count ON posts (subject, comment_count);
+DROP INDEX IF EXISTS idx_posts_subject;
@@ -0,0 +1,5 @@
+-- Full-text search over post titles and content (see Post.get_all).
+-- InnoDB keeps FULLTEXT indexes in sync itself. Words shorter than
+-- innodb_ft_min_token_size (3 by default) are not indexed.
+
+ALTER TABLE posts ADD FULLTEXT INDEX ft_posts_title_content (title, content);
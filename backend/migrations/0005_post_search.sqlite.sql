@@ -0,0 +1,28 @@
+-- Full-text search over post titles and content (see Post.get_all). The
+-- FTS5 index stores no copy of the text (content='posts') and is kept in
+-- sync by triggers.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    title, content,
+    content='posts', content_rowid='id'
+);
+
+CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts
+BEGIN
+    INSERT INTO posts_fts (rowid, title, content) VALUES (NEW.id, NEW.title, NEW.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts
+BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, content)
+    VALUES ('delete', OLD.id, OLD.title, OLD.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, content ON posts
+BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, content)
+    VALUES ('delete', OLD.id, OLD.title, OLD.content);
+    INSERT INTO posts_fts (rowid, title, content) VALUES (NEW.id, NEW.title, NEW.content);
+END;
+
+INSERT INTO posts_fts (posts_fts) VALUES ('rebuild');
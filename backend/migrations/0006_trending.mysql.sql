@@ -0,0 +1,23 @@
+-- Precomputed trending ranking (see trending.py). post_trending holds each
+-- post's hot score, read in index order by the 'trending' sort;
+-- trending_queue holds posts whose score must be recomputed.
+
+CREATE TABLE post_trending (
+    post_id INT PRIMARY KEY,
+    subject VARCHAR(50),
+    hot_score DOUBLE NOT NULL,
+    -- When the oldest comment counted as recent leaves the window
+    expires_at DATETIME NULL,
+    FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
+    INDEX idx_trending_hot (hot_score),
+    INDEX idx_trending_subject_hot (subject, hot_score),
+    INDEX idx_trending_expires (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE trending_queue (
+    post_id INT PRIMARY KEY,
+    FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- Existing posts are scored by the first refresh
+INSERT INTO trending_queue (post_id) SELECT id FROM posts;
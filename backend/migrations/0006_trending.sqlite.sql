@@ -0,0 +1,23 @@
+-- Precomputed trending ranking (see trending.py). post_trending holds each
+-- post's hot score, read in index order by the 'trending' sort;
+-- trending_queue holds posts whose score must be recomputed.
+
+CREATE TABLE IF NOT EXISTS post_trending (
+    post_id INTEGER PRIMARY KEY,
+    subject VARCHAR(50),
+    hot_score REAL NOT NULL,
+    -- When the oldest comment counted as recent leaves the window
+    expires_at DATETIME,
+    FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_trending_hot ON post_trending (hot_score);
+CREATE INDEX IF NOT EXISTS idx_trending_subject_hot ON post_trending (subject, hot_score);
+CREATE INDEX IF NOT EXISTS idx_trending_expires ON post_trending (expires_at);
+
+CREATE TABLE IF NOT EXISTS trending_queue (
+    post_id INTEGER PRIMARY KEY,
+    FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE
+);
+
+-- Existing posts are scored by the first refresh
+INSERT INTO trending_queue (post_id) SELECT id FROM posts;
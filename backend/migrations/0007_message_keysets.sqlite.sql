@@ -0,0 +1,6 @@
+-- Conversation messages are paged and polled by id (?after_id= /
+-- ?before_id=), newest first. (conversation_id, created_at) can't serve an
+-- id range, so index the id order per conversation. MySQL needs no change:
+-- InnoDB's idx_conversation already ends with the primary key.
+
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages (conversation_id, id);
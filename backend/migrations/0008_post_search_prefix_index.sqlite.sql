@@ -0,0 +1,17 @@
+-- Search while typing matches the last word as a prefix once it has three
+-- letters (sql_dialect.FULL_TEXT_MIN_PREFIX). Without a prefix index FTS5
+-- merges the entries of every word starting with those letters on each
+-- query; prefix='3' indexes the three-letter prefixes directly. FTS5 can't
+-- change its options in place, so the index is recreated (the triggers
+-- from 0005 refer to it by name and keep working). MySQL's FULLTEXT index
+-- needs no change.
+
+DROP TABLE IF EXISTS posts_fts;
+
+CREATE VIRTUAL TABLE posts_fts USING fts5(
+    title, content,
+    content='posts', content_rowid='id',
+    prefix='3'
+);
+
+INSERT INTO posts_fts (posts_fts) VALUES ('rebuild');
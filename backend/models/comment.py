@@ -3,15 +3,28 @@ Comment model - handles comment threads and replies
 Uses raw MySQL queries
 """
 
-from db import fetch_one, fetch_all, insert, update, delete as db_delete
+from db import fetch_one, fetch_all, insert, update, update_many, delete as db_delete, transaction, ROWS_TUPLE
+from models.rows import decode_timestamp, load_dict, load_row
 from datetime import datetime
 
+import trending
+
 
 class Comment:
     """Comment model for threaded discussions"""
     
+    # Columns kept from comments rows, with their decoders (see models.rows)
+    COLUMNS = {
+        'id': None, 'post_id': None, 'user_id': None, 'parent_id': None, 'content': None,
+        'is_best_answer': None, 'upvotes': None, 'downvotes': None,
+        'timestamp': decode_timestamp, 'edited_at': decode_timestamp,
+    }
+    __slots__ = tuple(COLUMNS) + ('_author', '_replies')
+    
     def __init__(self, id=None, post_id=None, user_id=None, parent_id=None,
-                 content=None, timestamp=None, edited_at=None, author=None, **kwargs):
+                 content=None, timestamp=None, edited_at=None, is_best_answer=False,
+                 upvotes=0, downvotes=0, author=None, **kwargs):
+        # Columns not in COLUMNS (kwargs) are ignored
         self.id = id
         self.post_id = post_id
         self.user_id = user_id
@@ -19,12 +32,11 @@ class Comment:
         self.content = content
         self.timestamp = timestamp
         self.edited_at = edited_at
+        self.is_best_answer = is_best_answer
+        self.upvotes = upvotes
+        self.downvotes = downvotes
         self._author = author
         self._replies = None
-        
-        # Store other fields as attributes
-        for key, value in kwargs.items():
-            setattr(self, key, value)
     
     @property
     def author(self):
@@ -44,31 +56,19 @@ class Comment:
     @staticmethod
     def from_dict(data):
         """Create Comment object from database row dict"""
-        if not data:
-            return None
-        
-        # Handle SQLite string timestamps
-        timestamp = data.get('timestamp')
-        if isinstance(timestamp, str):
-            try:
-                data['timestamp'] = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-            except ValueError:
-                pass
-
-        if isinstance(data.get('edited_at'), str):
-            try:
-                data['edited_at'] = datetime.strptime(data['edited_at'], '%Y-%m-%d %H:%M:%S')
-            except ValueError:
-                pass
-                
-        return Comment(**data)
+        return load_dict(Comment, data)
+    
+    @staticmethod
+    def from_row(row):
+        """Create Comment object from a tuple-backed row (db.ROWS_TUPLE)"""
+        return load_row(Comment, row)
     
     @staticmethod
     def get_by_id(comment_id):
         """Get comment by ID"""
         query = "SELECT * FROM comments WHERE id = %s"
-        data = fetch_one(query, (comment_id,))
-        return Comment.from_dict(data)
+        data = fetch_one(query, (comment_id,), row_mode=ROWS_TUPLE)
+        return Comment.from_row(data)
     
     @staticmethod
     def get_by_post(post_id, parent_only=False):
@@ -85,8 +85,40 @@ class Comment:
             WHERE post_id = %s
             ORDER BY timestamp ASC
             """
-        comments_data = fetch_all(query, (post_id,))
-        return [Comment.from_dict(c) for c in comments_data] if comments_data else []
+        comments_data = fetch_all(query, (post_id,), row_mode=ROWS_TUPLE)
+        from models.user import User
+        return User.prefetch([Comment.from_row(c) for c in comments_data])
+    
+    @staticmethod
+    def get_tree(post_id):
+        """
+        Get the whole comment thread of a post as a tree: returns the
+        top-level comments, with `replies` of every comment already filled
+        in. Costs two queries (comments, then their authors) however large
+        or deep the thread is.
+        """
+        query = """
+        SELECT * FROM comments
+        WHERE post_id = %s
+        ORDER BY timestamp ASC, id ASC
+        """
+        from models.user import User
+        comments_data = fetch_all(query, (post_id,), row_mode=ROWS_TUPLE)
+        comments = User.prefetch([Comment.from_row(c) for c in comments_data])
+        
+        by_id = {}
+        for comment in comments:
+            comment._replies = []
+            by_id[comment.id] = comment
+        
+        roots = []
+        for comment in comments:
+            parent = by_id.get(comment.parent_id) if comment.parent_id else None
+            if parent is not None:
+                parent._replies.append(comment)
+            else:
+                roots.append(comment)
+        return roots
     
     @staticmethod
     def get_by_parent(parent_id):
@@ -96,8 +128,9 @@ class Comment:
         WHERE parent_id = %s
         ORDER BY timestamp ASC
         """
-        comments_data = fetch_all(query, (parent_id,))
-        return [Comment.from_dict(c) for c in comments_data] if comments_data else []
+        comments_data = fetch_all(query, (parent_id,), row_mode=ROWS_TUPLE)
+        from models.user import User
+        return User.prefetch([Comment.from_row(c) for c in comments_data])
     
     @staticmethod
     def create(post_id, user_id, content, parent_id=None):
@@ -106,7 +139,13 @@ class Comment:
         INSERT INTO comments (post_id, user_id, content, parent_id)
         VALUES (%s, %s, %s, %s)
         """
-        comment_id = insert(query, (post_id, user_id, content, parent_id))
+        with transaction():
+            comment_id = insert(query, (post_id, user_id, content, parent_id))
+            update("UPDATE posts SET comment_count = comment_count + 1 WHERE id = %s", (post_id,))
+            update("UPDATE users SET comments_count = comments_count + 1 WHERE id = %s", (user_id,))
+            trending.touch(post_id)
+        from models.user import User
+        User.invalidate_cache(user_id)
         return Comment.get_by_id(comment_id)
     
     def update_content(self, content):
@@ -121,6 +160,27 @@ class Comment:
         self.edited_at = datetime.now()
     
     def delete(self):
-        """Delete comment"""
-        query = "DELETE FROM comments WHERE id = %s"
-        db_delete(query, (self.id,))
+        """Delete comment, its replies (by cascade) and their counts"""
+        from models.user import User
+        # Authors of the whole subtree the cascade is about to remove
+        subtree_query = """
+        WITH RECURSIVE subtree (id) AS (
+            SELECT id FROM comments WHERE id = %s
+            UNION ALL
+            SELECT c.id FROM comments c JOIN subtree s ON c.parent_id = s.id
+        )
+        SELECT c.user_id, COUNT(*) AS comments
+        FROM comments c JOIN subtree s ON s.id = c.id
+        GROUP BY c.user_id
+        """
+        with transaction():
+            authors = fetch_all(subtree_query, (self.id,), row_mode=ROWS_TUPLE)
+            removed = sum(a.comments for a in authors)
+            update_many("UPDATE users SET comments_count = comments_count - %s WHERE id = %s",
+                        [(a.comments, a.user_id) for a in authors])
+            update("UPDATE posts SET comment_count = comment_count - %s WHERE id = %s",
+                   (removed, self.post_id))
+            db_delete("DELETE FROM comments WHERE id = %s", (self.id,))
+            trending.touch(self.post_id)
+        for author in authors:
+            User.invalidate_cache(author.user_id)
@@ -3,50 +3,62 @@ Conversation model - handles direct messaging conversations
 Uses raw MySQL queries
 """
 
-from db import fetch_one, fetch_all, insert, update, delete as db_delete
+from db import (fetch_one, fetch_all, insert, insert_many, update, delete as db_delete,
+                transaction, ROWS_TUPLE)
+from models.rows import decode_timestamp, load_dict, load_row
 from datetime import datetime
 
 
 class Conversation:
     """Conversation model for direct messages"""
     
-    def __init__(self, id=None, type='direct', name=None, created_at=None, updated_at=None, **kwargs):
+    # Columns kept from conversations rows, with their decoders (see models.rows)
+    COLUMNS = {
+        'id': None, 'type': None, 'name': None,
+        'created_at': decode_timestamp, 'updated_at': decode_timestamp,
+        'last_message_at': decode_timestamp,
+    }
+    __slots__ = tuple(COLUMNS)
+    
+    def __init__(self, id=None, type='direct', name=None, created_at=None, updated_at=None,
+                 last_message_at=None, **kwargs):
+        # Columns not in COLUMNS (kwargs) are ignored
         self.id = id
         self.type = type
         self.name = name
         self.created_at = created_at
         self.updated_at = updated_at
-        
-        # Store other fields as attributes
-        for key, value in kwargs.items():
-            setattr(self, key, value)
+        self.last_message_at = last_message_at
     
     @staticmethod
     def from_dict(data):
         """Create Conversation object from database row dict"""
-        if not data:
-            return None
-        return Conversation(**data)
+        return load_dict(Conversation, data)
+    
+    @staticmethod
+    def from_row(row):
+        """Create Conversation object from a tuple-backed row (db.ROWS_TUPLE)"""
+        return load_row(Conversation, row)
     
     @staticmethod
     def get_by_id(conversation_id):
         """Get conversation by ID"""
         query = "SELECT * FROM conversations WHERE id = %s"
-        data = fetch_one(query, (conversation_id,))
-        return Conversation.from_dict(data)
+        data = fetch_one(query, (conversation_id,), row_mode=ROWS_TUPLE)
+        return Conversation.from_row(data)
     
     @staticmethod
     def create(type='direct', name=None, user_ids=None):
         """Create a new conversation with participants"""
         query = "INSERT INTO conversations (type, name) VALUES (%s, %s)"
-        conv_id = insert(query, (type, name))
-        
-        # Add participants
-        if user_ids:
-            for user_id in user_ids:
-                Conversation.add_participant(conv_id, user_id)
-        
-        return Conversation.get_by_id(conv_id)
+        with transaction():
+            conv_id = insert(query, (type, name))
+            
+            # Add participants
+            if user_ids:
+                Conversation.add_participants(conv_id, user_ids)
+            
+            return Conversation.get_by_id(conv_id)
     
     @staticmethod
     def add_participant(conversation_id, user_id):
@@ -57,6 +69,15 @@ class Conversation:
         """
         insert(query, (conversation_id, user_id))
     
+    @staticmethod
+    def add_participants(conversation_id, user_ids):
+        """Add several participants to a conversation in one batch"""
+        query = """
+        INSERT INTO conversation_participants (conversation_id, user_id)
+        VALUES (%s, %s)
+        """
+        insert_many(query, [(conversation_id, user_id) for user_id in user_ids])
+    
     @staticmethod
     def get_user_conversations(user_id):
         """Get all conversations for a user"""
@@ -69,8 +90,8 @@ class Conversation:
         GROUP BY c.id
         ORDER BY last_message_at DESC
         """
-        convs_data = fetch_all(query, (user_id,))
-        return [Conversation.from_dict(c) for c in convs_data] if convs_data else []
+        convs_data = fetch_all(query, (user_id,), row_mode=ROWS_TUPLE)
+        return [Conversation.from_row(c) for c in convs_data]
     
     @staticmethod
     def get_direct_conversation(user_id1, user_id2):
@@ -83,10 +104,10 @@ class Conversation:
         AND cp1.user_id = %s
         AND cp2.user_id = %s
         """
-        data = fetch_one(query, (user_id1, user_id2))
+        data = fetch_one(query, (user_id1, user_id2), row_mode=ROWS_TUPLE)
         
         if data:
-            return Conversation.from_dict(data)
+            return Conversation.from_row(data)
         else:
             # Create new conversation
             return Conversation.create(type='direct', user_ids=[user_id1, user_id2])
@@ -99,21 +120,65 @@ class Conversation:
         WHERE cp.conversation_id = %s
         """
         from models.user import User
-        users_data = fetch_all(query, (self.id,))
-        return [User.from_dict(u) for u in users_data] if users_data else []
+        users_data = fetch_all(query, (self.id,), row_mode=ROWS_TUPLE)
+        return [User.from_row(u) for u in users_data]
     
-    def get_messages(self, limit=50, offset=0):
-        """Get messages in this conversation"""
-        query = """
+    @staticmethod
+    def get_participants_many(conversation_ids):
+        """
+        Participants of several conversations with batched IN queries;
+        returns {conversation id: [User]}
+        """
+        from models.user import User
+        participants = {}
+        ids = list(dict.fromkeys(conversation_ids))
+        for start in range(0, len(ids), User.BATCH_SIZE):
+            chunk = ids[start:start + User.BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            query = f"""
+            SELECT cp.conversation_id, u.* FROM users u
+            INNER JOIN conversation_participants cp ON u.id = cp.user_id
+            WHERE cp.conversation_id IN ({placeholders})
+            """
+            for row in fetch_all(query, tuple(chunk), row_mode=ROWS_TUPLE):
+                participants.setdefault(row.conversation_id, []).append(User.from_row(row))
+        return participants
+    
+    def get_messages(self, limit=50, after_id=None, before_id=None):
+        """
+        Get a page of this conversation's messages, newest first, keyset-
+        paginated on message id over the (conversation_id, id) index:
+        before_id pages back through older history, after_id returns what
+        arrived since (the oldest `limit` of it, so a client catching up
+        misses nothing). Returns (messages, has_more).
+        """
+        where = "conversation_id = %s AND is_deleted = FALSE"
+        params = [self.id]
+        if after_id is not None:
+            where += " AND id > %s"
+            params.append(after_id)
+        if before_id is not None:
+            where += " AND id < %s"
+            params.append(before_id)
+        # New messages are read oldest first, so a long gap is filled in order
+        order = 'ASC' if after_id is not None and before_id is None else 'DESC'
+        query = f"""
         SELECT * FROM messages
-        WHERE conversation_id = %s
-        AND is_deleted = FALSE
-        ORDER BY created_at DESC
-        LIMIT %s OFFSET %s
+        WHERE {where}
+        ORDER BY id {order}
+        LIMIT %s
         """
+        params.append(limit + 1)
         from models.message import Message
-        msgs_data = fetch_all(query, (self.id, limit, offset))
-        return [Message.from_dict(m) for m in msgs_data] if msgs_data else []
+        from models.user import User
+        msgs_data = fetch_all(query, tuple(params), row_mode=ROWS_TUPLE)
+        has_more = len(msgs_data) > limit
+        msgs_data = msgs_data[:limit]
+        if order == 'ASC':
+            msgs_data.reverse()
+        messages = User.prefetch([Message.from_row(m) for m in msgs_data],
+                                 id_attr='sender_id', attr='_sender')
+        return messages, has_more
     
     def get_unread_count(self, user_id):
         """Get unread message count for a user"""
@@ -127,6 +192,22 @@ class Conversation:
         result = fetch_one(query, (user_id, self.id, user_id))
         return result['count'] if result else 0
     
+    @staticmethod
+    def get_unread_counts(user_id):
+        """
+        Unread message counts of all of a user's conversations in one query;
+        returns {conversation id: count}, without conversations that have none
+        """
+        query = """
+        SELECT m.conversation_id, COUNT(*) as count FROM messages m
+        INNER JOIN conversation_participants cp ON m.conversation_id = cp.conversation_id AND cp.user_id = %s
+        WHERE m.sender_id != %s
+        AND m.created_at > COALESCE(cp.last_read_at, '1970-01-01')
+        GROUP BY m.conversation_id
+        """
+        rows = fetch_all(query, (user_id, user_id), row_mode=ROWS_TUPLE)
+        return {row.conversation_id: row.count for row in rows}
+    
     def mark_as_read(self, user_id):
         """Mark all messages as read for a user"""
         now = datetime.utcnow()
@@ -3,16 +3,27 @@ Message model - handles direct messages
 Uses raw MySQL queries
 """
 
-from db import fetch_one, fetch_all, insert, update, delete as db_delete
+from db import (fetch_one, fetch_all, insert, insert_many, update, delete as db_delete,
+                transaction, upsert, ROWS_TUPLE)
+from models.rows import decode_timestamp, load_dict, load_row
 from datetime import datetime
 
 
 class Message:
     """Message model for direct messaging"""
     
+    # Columns kept from messages rows, with their decoders (see models.rows)
+    COLUMNS = {
+        'id': None, 'conversation_id': None, 'sender_id': None, 'content': None,
+        'message_type': None, 'attachment_url': None, 'is_read': None, 'is_deleted': None,
+        'created_at': decode_timestamp, 'edited_at': decode_timestamp,
+    }
+    __slots__ = tuple(COLUMNS) + ('_sender',)
+    
     def __init__(self, id=None, conversation_id=None, sender_id=None, content=None,
                  message_type='text', attachment_url=None, is_read=False, is_deleted=False,
-                 created_at=None, edited_at=None, sender=None):
+                 created_at=None, edited_at=None, sender=None, **kwargs):
+        # Columns not in COLUMNS (kwargs) are ignored
         self.id = id
         self.conversation_id = conversation_id
         self.sender_id = sender_id
@@ -36,16 +47,19 @@ class Message:
     @staticmethod
     def from_dict(data):
         """Create Message object from database row dict"""
-        if not data:
-            return None
-        return Message(**data)
+        return load_dict(Message, data)
+    
+    @staticmethod
+    def from_row(row):
+        """Create Message object from a tuple-backed row (db.ROWS_TUPLE)"""
+        return load_row(Message, row)
     
     @staticmethod
     def get_by_id(message_id):
         """Get message by ID"""
         query = "SELECT * FROM messages WHERE id = %s"
-        data = fetch_one(query, (message_id,))
-        return Message.from_dict(data)
+        data = fetch_one(query, (message_id,), row_mode=ROWS_TUPLE)
+        return Message.from_row(data)
     
     @staticmethod
     def send(conversation_id, sender_id, content, message_type='text', attachment_url=None):
@@ -54,14 +68,35 @@ class Message:
         INSERT INTO messages (conversation_id, sender_id, content, message_type, attachment_url)
         VALUES (%s, %s, %s, %s, %s)
         """
-        message_id = insert(query, (conversation_id, sender_id, content, message_type, attachment_url))
-        
-        # Update conversation timestamp using Python side datetime
-        now = datetime.utcnow()
         update_conv = "UPDATE conversations SET updated_at = %s WHERE id = %s"
-        update(update_conv, (now, conversation_id))
-        
-        return Message.get_by_id(message_id)
+        with transaction():
+            message_id = insert(query, (conversation_id, sender_id, content, message_type, attachment_url))
+            
+            # Update conversation timestamp using Python side datetime
+            now = datetime.utcnow()
+            update(update_conv, (now, conversation_id))
+            
+            return Message.get_by_id(message_id)
+    
+    @staticmethod
+    def send_many(conversation_id, messages):
+        """
+        Send several messages to one conversation in a single batch.
+        `messages` is an iterable of (sender_id, content) pairs; returns the
+        new message ids where the backend reports them (see db.insert_many)
+        """
+        query = """
+        INSERT INTO messages (conversation_id, sender_id, content, message_type, attachment_url)
+        VALUES (%s, %s, %s, 'text', NULL)
+        """
+        rows = [(conversation_id, sender_id, content) for sender_id, content in messages]
+        if not rows:
+            return []
+        update_conv = "UPDATE conversations SET updated_at = %s WHERE id = %s"
+        with transaction():
+            message_ids = insert_many(query, rows)
+            update(update_conv, (datetime.utcnow(), conversation_id))
+        return message_ids
     
     def edit(self, new_content):
         """Edit message content"""
@@ -84,12 +119,9 @@ class Message:
     
     def add_reaction(self, user_id, emoji):
         """Add emoji reaction to message"""
-        query = """
-        INSERT INTO message_reactions (message_id, user_id, emoji)
-        VALUES (%s, %s, %s)
-        ON DUPLICATE KEY UPDATE emoji = %s
-        """
-        insert(query, (self.id, user_id, emoji, emoji))
+        query = upsert('message_reactions', ('message_id', 'user_id', 'emoji'),
+                       conflict=('message_id', 'user_id', 'emoji'), update=('emoji',))
+        insert(query, (self.id, user_id, emoji))
     
     def get_reactions(self):
         """Get all reactions for this message"""
@@ -3,16 +3,73 @@ Post model - handles discussion posts
 Uses raw MySQL queries
 """
 
-from db import fetch_one, fetch_all, insert, update, delete as db_delete
+from db import (fetch_one, fetch_all, insert, update, update_many, delete as db_delete,
+                transaction, full_text_query, full_text_search, FULL_TEXT_MIN_PREFIX,
+                ROWS_TUPLE)
+from models.rows import decode_timestamp, load_dict, load_row
+from collections import namedtuple
 from datetime import datetime
+import base64
+import json
+import re
+
+# Module import: trending imports models.rows, which loads this package
+import trending
+import view_counts
+
+_WORD = re.compile(r'\w+')
+
+# One page of Post.get_all: the posts, the cursor of the next page (None on
+# the last) and whether a capped search left older matches out
+PostPage = namedtuple('PostPage', ['posts', 'next_cursor', 'truncated'])
+
+
+def _make_snippet(text, words, size=24):
+    """
+    Excerpt of `text` around the first of the searched `words`, with every
+    word they prefix wrapped in <mark>. Built in Python for the posts of one
+    page only: FTS5's snippet() would run for every match before sorting,
+    and MySQL has no equivalent.
+    """
+    prefixes = tuple(word.lower() for word in words)
+    tokens = (text or '').split()
+    hits = set()
+    for i, token in enumerate(tokens):
+        word = _WORD.search(token)
+        if word and word.group().lower().startswith(prefixes):
+            hits.add(i)
+    start = max(min(hits) - size // 2, 0) if hits else 0
+    excerpt = ' '.join(f'<mark>{token}</mark>' if i in hits else token
+                       for i, token in enumerate(tokens[start:start + size], start))
+    if start > 0:
+        excerpt = '…' + excerpt
+    if start + size < len(tokens):
+        excerpt += '…'
+    return excerpt
 
 
 class Post:
     """Post model for discussion threads"""
     
+    # Columns kept from posts rows, with their decoders (see models.rows)
+    COLUMNS = {
+        'id': None, 'user_id': None, 'title': None, 'content': None, 'subject': None,
+        'is_question': None, 'is_answered': None, 'best_answer_id': None,
+        'is_pinned': None, 'is_deleted': None,
+        'view_count': None, 'upvotes': None, 'downvotes': None, 'comment_count': None,
+        'timestamp': decode_timestamp, 'edited_at': decode_timestamp,
+        # Listings only: the value get_all sorted by
+        'sort_key': None,
+    }
+    # snippet: highlighted excerpt, set on search results by get_all
+    __slots__ = tuple(COLUMNS) + ('snippet', '_author')
+    
     def __init__(self, id=None, user_id=None, title=None, content=None,
                  subject=None, timestamp=None, edited_at=None, view_count=0,
-                 upvotes=0, downvotes=0, author=None, **kwargs):
+                 upvotes=0, downvotes=0, is_question=False, is_answered=False,
+                 best_answer_id=None, is_pinned=False, is_deleted=False,
+                 comment_count=0, author=None, **kwargs):
+        # Columns not in COLUMNS (kwargs) are ignored
         self.id = id
         self.user_id = user_id
         self.title = title
@@ -23,11 +80,15 @@ class Post:
         self.view_count = view_count
         self.upvotes = upvotes
         self.downvotes = downvotes
+        self.is_question = is_question
+        self.is_answered = is_answered
+        self.best_answer_id = best_answer_id
+        self.is_pinned = is_pinned
+        self.is_deleted = is_deleted
+        self.comment_count = comment_count
+        self.sort_key = None
+        self.snippet = None
         self._author = author
-        
-        # Store other fields as attributes
-        for key, value in kwargs.items():
-            setattr(self, key, value)
     
     @property
     def score(self):
@@ -45,71 +106,176 @@ class Post:
     @staticmethod
     def from_dict(data):
         """Create Post object from database row dict"""
-        if not data:
-            return None
-            
-        # Handle SQLite string timestamps
-        timestamp = data.get('timestamp')
-        if isinstance(timestamp, str):
-            try:
-                data['timestamp'] = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-            except ValueError:
-                pass
-        
-        edited_at = data.get('edited_at')
-        if isinstance(edited_at, str):
-            try:
-                data['edited_at'] = datetime.strptime(edited_at, '%Y-%m-%d %H:%M:%S')
-            except ValueError:
-                pass
-                
-        return Post(**data)
+        return load_dict(Post, data)
     
     @staticmethod
-    def get_all(search=None, subject=None, sort_by='latest', limit=100):
-        """Get all posts with optional filters"""
-        query = """
-        SELECT * FROM posts WHERE 1=1
+    def from_row(row):
+        """Create Post object from a tuple-backed row (db.ROWS_TUPLE)"""
+        return load_row(Post, row)
+    
+    # Author columns joined into listing rows as author_<column>
+    LISTING_AUTHOR_COLUMNS = ('username', 'name', 'branch', 'year', 'avatar_url')
+    
+    # Listing sort -> column it orders by; ties are broken by post id.
+    # 'relevance' (searches only) orders by full-text rank instead, and
+    # 'trending' by the precomputed hot score (see trending.py).
+    SORT_KEYS = {'latest': 'p.timestamp', 'top': 'p.score', 'most_active': 'p.comment_count',
+                 'trending': 't.hot_score'}
+    
+    # Full-text search: a title match weighs as much as ten in the content
+    SEARCH_COLUMNS = ('title', 'content')
+    SEARCH_WEIGHTS = (10.0, 1.0)
+    # Matches considered by a 'relevance' sort or a one- or two-letter
+    # search: the newest ones
+    SEARCH_CANDIDATES = 1000
+    
+    @staticmethod
+    def get_all(search=None, subject=None, sort_by='latest', limit=20, cursor=None):
         """
+        Get one page of posts with optional filters, in one query: each post
+        comes with its author (the LISTING_AUTHOR_COLUMNS only) and the value
+        it was sorted by (`sort_key`).
+        `search` uses the full-text index (every word must match, the last
+        one as a prefix); found posts carry a highlighted `snippet` and can
+        be sorted by 'relevance'. Relevance ranks only the newest
+        SEARCH_CANDIDATES matches, and searches for one- and two-letter
+        words list only those, by 'latest' instead of relevance; paging
+        ends after them, and the last page is marked `truncated` if there
+        were more matches.
+        Pages are keyset-paginated on (sort key, id), so any page costs the
+        same as the first. Returns a PostPage(posts, next_cursor, truncated);
+        pass next_cursor back to get the following page. It is None on the
+        last page. Raises ValueError for a cursor that isn't from the same
+        sort.
+        """
+        match = full_text_query(search) if search else None
+        if sort_by not in Post.SORT_KEYS and not (sort_by == 'relevance' and match):
+            sort_by = 'latest'
+        # Only one- and two-letter words (the first keystrokes): they match
+        # most posts, so only the newest matches are sorted, and by 'latest'
+        short = match and max(map(len, _WORD.findall(search))) < FULL_TEXT_MIN_PREFIX
+        if short and sort_by == 'relevance':
+            sort_by = 'latest'
+        
+        joins = ""
+        join_params = []
+        where = "1=1"
         params = []
+        # Trending reads post_trending in index order, so filter and break
+        # ties on its columns
+        id_column, subject_column = 'p.id', 'p.subject'
+        if sort_by == 'trending':
+            joins = "JOIN post_trending t ON t.post_id = p.id"
+            id_column, subject_column = 't.post_id', 't.subject'
         
-        if search:
-            query += " AND (title LIKE %s OR content LIKE %s)"
-            params.extend([f'%{search}%', f'%{search}%'])
+        if match:
+            candidates = Post.SEARCH_CANDIDATES if short or sort_by == 'relevance' else None
+            fts = full_text_search('posts', 'p', Post.SEARCH_COLUMNS, Post.SEARCH_WEIGHTS,
+                                   candidates)
+            joins = f"{joins} {fts.join}"
+            join_params = [match] * fts.join_params
+            if fts.condition:
+                where += f" AND {fts.condition}"
+                params.append(match)
+        elif search:
+            # Nothing searchable in the input: no post can match
+            return PostPage([], None, False)
         
         if subject:
-            query += " AND subject = %s"
+            where += f" AND {subject_column} = %s"
             params.append(subject)
         
-        # Sorting
-        if sort_by == 'top':
-            query += " ORDER BY (upvotes - downvotes) DESC"
-        elif sort_by == 'most_active':
-            query = """
-            SELECT p.*, COUNT(c.id) as comment_count
-            FROM posts p
-            LEFT JOIN comments c ON p.id = c.post_id
-            WHERE 1=1
-            """
-            if search:
-                query += " AND (p.title LIKE %s OR p.content LIKE %s)"
-            if subject:
-                query += " AND p.subject = %s"
-            query += " GROUP BY p.id ORDER BY comment_count DESC"
-        else:  # latest
-            query += " ORDER BY timestamp DESC"
+        if sort_by == 'relevance':
+            key, key_params = fts.relevance, [match] * fts.relevance_params
+        else:
+            key, key_params = Post.SORT_KEYS[sort_by], []
         
-        query += f" LIMIT {limit}"
+        if cursor:
+            last_key, last_id = Post._decode_cursor(cursor, sort_by)
+            # Same as (key, id) < (last_key, last_id), written so the key's
+            # index is range-scanned on both backends
+            where += f" AND {key} <= %s AND ({key} < %s OR {id_column} < %s)"
+            params.extend(key_params + [last_key] + key_params + [last_key, last_id])
         
-        posts_data = fetch_all(query, tuple(params))
-        return [Post.from_dict(p) for p in posts_data] if posts_data else []
+        # The page is picked on ids and sort keys alone, then joined back to
+        # the full rows, so a search sorts its matches' ids, not their text.
+        # One extra row tells whether there is a next page.
+        author_columns = ', '.join(f"u.{col} AS author_{col}" for col in Post.LISTING_AUTHOR_COLUMNS)
+        query = f"""
+        SELECT p.*, {author_columns}, page.sort_key
+        FROM (
+            SELECT {id_column} AS id, {key} AS sort_key
+            FROM posts p
+            {joins}
+            WHERE {where}
+            ORDER BY sort_key DESC, {id_column} DESC
+            LIMIT %s
+        ) page
+        JOIN posts p ON p.id = page.id
+        LEFT JOIN users u ON u.id = p.user_id
+        ORDER BY page.sort_key DESC, p.id DESC
+        """
+        params.append(limit + 1)
+        
+        posts_data = fetch_all(query, tuple(key_params + join_params + params), row_mode=ROWS_TUPLE)
+        posts = [Post._from_listing_row(p) for p in posts_data[:limit]]
+        if match:
+            words = _WORD.findall(search)
+            for post in posts:
+                post.snippet = _make_snippet(post.content, words)
+        next_cursor = None
+        if len(posts_data) > limit and posts:
+            next_cursor = Post._encode_cursor(posts[-1], sort_by)
+        truncated = False
+        if next_cursor is None and match and fts.more_matches:
+            # Last page of a capped search: say whether the cap cut it short
+            truncated = fetch_one(fts.more_matches, (match,)) is not None
+        return PostPage(posts, next_cursor, truncated)
+    
+    @staticmethod
+    def _encode_cursor(post, sort_by):
+        """Opaque cursor for the page after `post`: base64 of the sort and its (key, id)"""
+        key = post.sort_key
+        if isinstance(key, datetime):
+            # MySQL; SQLite returns the stored text, which it compares as such
+            key = key.isoformat(sep=' ')
+        payload = json.dumps([sort_by, key, post.id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(cursor, sort_by):
+        """(key, id) from a cursor made by _encode_cursor for `sort_by`"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            cursor_sort, key, post_id = json.loads(base64.urlsafe_b64decode(padded))
+        except (ValueError, TypeError):
+            raise ValueError('Invalid cursor')
+        expected = str if sort_by == 'latest' else (int, float)
+        # JSON true/false would pass as ints
+        if (cursor_sort != sort_by or not isinstance(key, expected) or isinstance(key, bool)
+                or not isinstance(post_id, int) or isinstance(post_id, bool)):
+            raise ValueError('Invalid cursor')
+        return key, post_id
+    
+    @staticmethod
+    def _from_listing_row(row):
+        """Post from a get_all row, with the joined author attached"""
+        from models.user import User
+        post = Post.from_row(row)
+        fields = {col: row[f'author_{col}'] for col in Post.LISTING_AUTHOR_COLUMNS}
+        if fields['username'] is not None:
+            post._author = User(id=post.user_id, **fields)
+        return post
     
     @staticmethod
     def get_by_id(post_id):
-        """Get post by ID"""
+        """Get post by ID (view_count includes this worker's unflushed views)"""
         query = "SELECT * FROM posts WHERE id = %s"
-        data = fetch_one(query, (post_id,))
-        return Post.from_dict(data)
+        data = fetch_one(query, (post_id,), row_mode=ROWS_TUPLE)
+        post = Post.from_row(data)
+        if post is not None:
+            post.view_count = (post.view_count or 0) + view_counts.pending(post.id)
+        return post
     
     @staticmethod
     def create(user_id, title, content, subject):
@@ -119,7 +285,13 @@ class Post:
         VALUES (%s, %s, %s, %s)
         """
         # Use subject as category (they're the same in our forum setup)
-        post_id = insert(query, (user_id, title, content, subject))
+        with transaction():
+            post_id = insert(query, (user_id, title, content, subject))
+            update("UPDATE users SET posts_count = posts_count + 1 WHERE id = %s", (user_id,))
+            # Scored right away so new posts show up in the trending sort
+            trending.refresh([post_id])
+        from models.user import User
+        User.invalidate_cache(user_id)
         return Post.get_by_id(post_id)
     
     def update_content(self, title, content, subject):
@@ -129,25 +301,32 @@ class Post:
         SET title = %s, content = %s, subject = %s, edited_at = NOW()
         WHERE id = %s
         """
-        update(query, (title, content, subject, self.id))
+        with transaction():
+            update(query, (title, content, subject, self.id))
+            trending.touch(self.id)
         self.title = title
         self.content = content
         self.subject = subject
         self.edited_at = datetime.now()
     
     def increment_view_count(self):
-        """Increment view count"""
-        query = "UPDATE posts SET view_count = view_count + 1 WHERE id = %s"
-        update(query, (self.id,))
+        """Count a view; buffered and written in batches (see view_counts)"""
+        view_counts.record(self.id)
         self.view_count += 1
     
     def delete(self):
-        """Delete post"""
-        query = "DELETE FROM posts WHERE id = %s"
-        db_delete(query, (self.id,))
-    
-    def comment_count(self):
-        """Get number of comments"""
-        query = "SELECT COUNT(*) as count FROM comments WHERE post_id = %s"
-        result = fetch_one(query, (self.id,))
-        return result['count'] if result else 0
+        """Delete post, its comments (by cascade) and their counts"""
+        from models.user import User
+        commenters_query = """
+        SELECT user_id, COUNT(*) AS comments FROM comments
+        WHERE post_id = %s
+        GROUP BY user_id
+        """
+        with transaction():
+            commenters = fetch_all(commenters_query, (self.id,), row_mode=ROWS_TUPLE)
+            update_many("UPDATE users SET comments_count = comments_count - %s WHERE id = %s",
+                        [(c.comments, c.user_id) for c in commenters])
+            update("UPDATE users SET posts_count = posts_count - 1 WHERE id = %s", (self.user_id,))
+            db_delete("DELETE FROM posts WHERE id = %s", (self.id,))
+        for user_id in {self.user_id, *(c.user_id for c in commenters)}:
+            User.invalidate_cache(user_id)
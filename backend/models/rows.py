@@ -0,0 +1,76 @@
+"""
+Row loading shared by the models
+Every model declares COLUMNS, mapping each column it keeps to a decoder
+(or None to keep the value as is), and stores them in __slots__. Rows are
+turned into objects by a loader compiled once per model and result layout,
+so per row there is no dict building, no kwargs and no format parsing.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+
+def decode_timestamp(value):
+    """
+    DATETIME columns come back as text from SQLite ('2024-01-31 12:00:00')
+    and as datetime from MySQL; text is parsed with fromisoformat
+    """
+    if value.__class__ is str:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+@lru_cache(maxsize=256)
+def row_loader(cls, fields):
+    """
+    Return a function building a `cls` from a row laid out as `fields`.
+    Columns not in cls.COLUMNS are skipped; slots the row doesn't fill get
+    the defaults of cls().
+    """
+    columns = cls.COLUMNS
+    template = cls()
+    setters = {name: getattr(cls, name).__set__ for name in cls.__slots__}
+
+    plain = []
+    decoded = []
+    for idx, field in enumerate(fields):
+        if field not in columns:
+            continue
+        decoder = columns[field]
+        if decoder is None:
+            plain.append((idx, setters[field]))
+        else:
+            decoded.append((idx, setters[field], decoder))
+    loaded = {field for field in fields if field in columns}
+    defaults = [(setters[name], getattr(template, name))
+                for name in cls.__slots__ if name not in loaded]
+    new = cls.__new__
+
+    def load(row):
+        obj = new(cls)
+        for setter, value in defaults:
+            setter(obj, value)
+        for idx, setter in plain:
+            setter(obj, row[idx])
+        for idx, setter, decoder in decoded:
+            setter(obj, decoder(row[idx]))
+        return obj
+
+    return load
+
+
+def load_row(cls, row):
+    """Build a `cls` from a tuple-backed row (db.ROWS_TUPLE), or None"""
+    if not row:
+        return None
+    return row_loader(cls, row._fields)(row)
+
+
+def load_dict(cls, data):
+    """Build a `cls` from a row dict (db.ROWS_DICT), or None"""
+    if not data:
+        return None
+    return row_loader(cls, tuple(data))(tuple(data.values()))
@@ -4,18 +4,44 @@ Uses raw MySQL queries
 """
 
 from werkzeug.security import generate_password_hash, check_password_hash
-from db import fetch_one, fetch_all, insert, update
+from db import fetch_one, fetch_all, insert, update, execute, delete as db_delete, insert_ignore, after_commit, transaction, ROWS_TUPLE
+from models.rows import decode_timestamp, load_dict, load_row
+from cache import TTLCache, MISSING, USER_CACHE_SIZE, USER_CACHE_TTL
 from datetime import datetime
 
+# Process-wide caches behind get_by_id, get_by_email and get_many. Cached
+# users are shared between requests, so treat them as read-only and call
+# User.invalidate_cache() after writing to the users table.
+_users_by_id = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL, name='users')
+_user_ids_by_email = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL, name='user_emails')
+
 
 class User:
     """User model for authentication and profiles"""
     
+    # Columns kept from users rows, with their decoders (see models.rows)
+    COLUMNS = {
+        'id': None, 'username': None, 'name': None, 'email': None, 'password_hash': None,
+        'role': None, 'display_name': None, 'avatar_url': None, 'bio': None, 'status': None,
+        'branch': None, 'year': None, 'section': None, 'skills': None,
+        'linkedin_url': None, 'github_url': None, 'reputation_points': None,
+        'is_moderator': None,
+        # Maintained counters (see migrations/0003_counters and maintenance.py)
+        'followers_count': None, 'following_count': None,
+        'posts_count': None, 'comments_count': None,
+        'created_at': decode_timestamp, 'last_seen': decode_timestamp,
+    }
+    __slots__ = tuple(COLUMNS)
+    
+    # Ids per `WHERE id IN (...)` query in get_many
+    BATCH_SIZE = 500
+    
     def __init__(self, id=None, username=None, name=None, email=None, password_hash=None,
                  role='student', created_at=None, display_name=None, avatar_url=None,
                  bio=None, status=None, branch=None, year=None, section=None, skills=None,
                  linkedin_url=None, github_url=None, reputation_points=0, is_moderator=False,
-                 last_seen=None, **kwargs):
+                 last_seen=None, followers_count=0, following_count=0, posts_count=0,
+                 comments_count=0, **kwargs):
         self.id = id
         self.username = username
         self.name = name
@@ -36,10 +62,11 @@ class User:
         self.reputation_points = reputation_points
         self.is_moderator = is_moderator
         self.last_seen = last_seen
-        
-        # Store other fields
-        for key, value in kwargs.items():
-            setattr(self, key, value)
+        self.followers_count = followers_count
+        self.following_count = following_count
+        self.posts_count = posts_count
+        self.comments_count = comments_count
+        # Columns not in COLUMNS (kwargs) are ignored
     
     # Flask-Login required properties
     @property
@@ -50,12 +77,6 @@ class User:
     def is_active(self):
         return True
     
-    @is_active.setter
-    def is_active(self, value):
-        # We don't actually store this in this simple model, but we need the setter
-        # so that setattr(self, 'is_active', value) doesn't crash
-        pass
-    
     @property
     def is_anonymous(self):
         return False
@@ -74,23 +95,94 @@ class User:
     @staticmethod
     def from_dict(data):
         """Create User object from database row dict"""
-        if not data:
-            return None
-        return User(**data)
+        return load_dict(User, data)
+    
+    @staticmethod
+    def from_row(row):
+        """Create User object from a tuple-backed row (db.ROWS_TUPLE)"""
+        return load_row(User, row)
     
     @staticmethod
-    def get_by_id(user_id):
-        """Get user by ID"""
+    def get_by_id(user_id, cached=True):
+        """Get user by ID (from the user cache unless cached=False)"""
+        if cached:
+            user = _users_by_id.get(user_id)
+            if user is not MISSING:
+                return user
         query = "SELECT * FROM users WHERE id = %s"
-        data = fetch_one(query, (user_id,))
-        return User.from_dict(data)
+        data = fetch_one(query, (user_id,), row_mode=ROWS_TUPLE)
+        user = User.from_row(data)
+        if cached and user is not None:
+            _users_by_id.set(user.id, user)
+        return user
+    
+    @staticmethod
+    def get_many(user_ids):
+        """Get several users with batched IN queries; returns {id: User}"""
+        users = {}
+        ids = []
+        for uid in dict.fromkeys(uid for uid in user_ids if uid is not None):
+            user = _users_by_id.get(uid)
+            if user is MISSING:
+                ids.append(uid)
+            else:
+                users[uid] = user
+        
+        for start in range(0, len(ids), User.BATCH_SIZE):
+            chunk = ids[start:start + User.BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            query = f"SELECT * FROM users WHERE id IN ({placeholders})"
+            for row in fetch_all(query, tuple(chunk), row_mode=ROWS_TUPLE):
+                user = User.from_row(row)
+                users[user.id] = user
+                _users_by_id.set(user.id, user)
+        return users
+    
+    @staticmethod
+    def prefetch(objects, id_attr='user_id', attr='_author'):
+        """
+        Resolve the lazy author (or sender) of many models with one batched
+        load, so the property doesn't query per object. Sets `attr` on each
+        object to the user its `id_attr` refers to. Returns `objects`.
+        """
+        pending = [obj for obj in objects
+                   if getattr(obj, attr, None) is None and getattr(obj, id_attr, None)]
+        if pending:
+            users = User.get_many(getattr(obj, id_attr) for obj in pending)
+            for obj in pending:
+                setattr(obj, attr, users.get(getattr(obj, id_attr)))
+        return objects
     
     @staticmethod
     def get_by_email(email):
-        """Get user by email"""
+        """Get user by email (cached)"""
+        user_id = _user_ids_by_email.get(email)
+        if user_id is not MISSING:
+            user = User.get_by_id(user_id)
+            if user is not None and user.email == email:
+                return user
+        
         query = "SELECT * FROM users WHERE email = %s"
-        data = fetch_one(query, (email,))
-        return User.from_dict(data)
+        data = fetch_one(query, (email,), row_mode=ROWS_TUPLE)
+        user = User.from_row(data)
+        if user is not None:
+            _users_by_id.set(user.id, user)
+            _user_ids_by_email.set(email, user.id)
+        return user
+    
+    @staticmethod
+    def invalidate_cache(user_id):
+        """
+        Forget a cached user after its row changed: right away, and again
+        once the write commits so a concurrent read can't re-cache old data
+        """
+        _users_by_id.invalidate(user_id)
+        after_commit(lambda: _users_by_id.invalidate(user_id))
+    
+    @staticmethod
+    def cache_stats():
+        """Hit/miss counters of the user caches of this process"""
+        return [_users_by_id.stats(), _user_ids_by_email.stats()]
     
     @staticmethod
     def create(username, name, email, password, branch=None, year=None, section=None, role='student'):
@@ -101,7 +193,9 @@ class User:
         VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """
         user_id = insert(query, (username, name, email, password_hash, role, branch, year, section))
-        return User.get_by_id(user_id)
+        User.invalidate_cache(user_id)
+        # Not cached until the insert is known to have committed
+        return User.get_by_id(user_id, cached=False)
     
     def update_profile(self, name=None, branch=None, year=None, bio=None,
                       linkedin_url=None, github_url=None):
@@ -113,6 +207,7 @@ class User:
         WHERE id = %s
         """
         update(query, (name, branch, year, bio, linkedin_url, github_url, self.id))
+        User.invalidate_cache(self.id)
         
         # Update object attributes
         self.name = name
@@ -124,15 +219,40 @@ class User:
     
     def get_posts_count(self):
         """Get number of posts by this user"""
-        query = "SELECT COUNT(*) as count FROM posts WHERE user_id = %s"
-        result = fetch_one(query, (self.id,))
-        return result['count'] if result else 0
+        return self.posts_count or 0
     
     def get_comments_count(self):
         """Get number of comments by this user"""
-        query = "SELECT COUNT(*) as count FROM comments WHERE user_id = %s"
-        result = fetch_one(query, (self.id,))
-        return result['count'] if result else 0
+        return self.comments_count or 0
+    
+    @staticmethod
+    def follow(follower_id, following_id):
+        """Follow a user; returns False if already following"""
+        query = insert_ignore('user_follows', ('follower_id', 'following_id'))
+        with transaction():
+            followed = execute(query, (follower_id, following_id)) > 0
+            if followed:
+                User._add_follow_counts(follower_id, following_id, 1)
+        return followed
+    
+    @staticmethod
+    def unfollow(follower_id, following_id):
+        """Unfollow a user; returns False if not following"""
+        query = "DELETE FROM user_follows WHERE follower_id = %s AND following_id = %s"
+        with transaction():
+            unfollowed = db_delete(query, (follower_id, following_id)) > 0
+            if unfollowed:
+                User._add_follow_counts(follower_id, following_id, -1)
+        return unfollowed
+    
+    @staticmethod
+    def _add_follow_counts(follower_id, following_id, delta):
+        update("UPDATE users SET following_count = following_count + %s WHERE id = %s",
+               (delta, follower_id))
+        update("UPDATE users SET followers_count = followers_count + %s WHERE id = %s",
+               (delta, following_id))
+        User.invalidate_cache(follower_id)
+        User.invalidate_cache(following_id)
     
     def get_recent_posts(self, limit=10):
         """Get user's recent posts"""
@@ -143,5 +263,8 @@ class User:
         LIMIT %s
         """
         from models.post import Post
-        posts_data = fetch_all(query, (self.id, limit))
-        return [Post.from_dict(p) for p in posts_data] if posts_data else []
+        posts_data = fetch_all(query, (self.id, limit), row_mode=ROWS_TUPLE)
+        posts = [Post.from_row(p) for p in posts_data]
+        for post in posts:
+            post._author = self
+        return posts
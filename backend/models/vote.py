@@ -3,12 +3,26 @@ Vote model - handles upvotes and downvotes
 Uses raw MySQL queries
 """
 
-from db import fetch_one, insert, delete as db_delete, update
+from collections import namedtuple
+
+from db import (fetch_one, insert_many, delete as db_delete, update, update_many, execute,
+                insert_ignore, returning, transaction, ROWS_TUPLE)
+from models.rows import decode_timestamp, load_dict, load_row
+
+# Outcome of Vote.cast: the user's vote now (1, -1 or 0) and the fresh counters
+VoteResult = namedtuple('VoteResult', ['user_vote', 'upvotes', 'downvotes'])
 
 
 class Vote:
     """Vote model for post and comment voting"""
     
+    # Columns kept from votes rows, with their decoders (see models.rows)
+    COLUMNS = {
+        'id': None, 'user_id': None, 'post_id': None, 'comment_id': None,
+        'vote_type': None, 'timestamp': decode_timestamp,
+    }
+    __slots__ = tuple(COLUMNS)
+    
     def __init__(self, id=None, user_id=None, post_id=None, comment_id=None,
                  vote_type=None, timestamp=None):
         self.id = id
@@ -21,40 +35,82 @@ class Vote:
     @staticmethod
     def from_dict(data):
         """Create Vote object from database row dict"""
-        if not data:
-            return None
-        return Vote(**data)
+        return load_dict(Vote, data)
+    
+    @staticmethod
+    def from_row(row):
+        """Create Vote object from a tuple-backed row (db.ROWS_TUPLE)"""
+        return load_row(Vote, row)
     
     @staticmethod
     def get_user_vote_on_post(user_id, post_id):
         """Check if user has voted on a post"""
         query = "SELECT * FROM votes WHERE user_id = %s AND post_id = %s"
-        data = fetch_one(query, (user_id, post_id))
-        return Vote.from_dict(data)
+        data = fetch_one(query, (user_id, post_id), row_mode=ROWS_TUPLE)
+        return Vote.from_row(data)
+    
+    # Vote target -> (table holding its upvotes/downvotes, votes column)
+    TARGETS = {'post': ('posts', 'post_id'), 'comment': ('comments', 'comment_id')}
     
     @staticmethod
-    def create_or_update(user_id, post_id=None, comment_id=None, vote_type=1):
-        """Create or update a vote"""
-        # Check for existing vote
-        if post_id:
-            existing = Vote.get_user_vote_on_post(user_id, post_id)
-            if existing:
-                if existing.vote_type == vote_type:
-                    # Remove vote (toggle off)
-                    return Vote.remove_vote(user_id, post_id=post_id)
-                else:
-                    # Update vote
-                    query = "UPDATE votes SET vote_type = %s WHERE id = %s"
-                    update(query, (vote_type, existing.id))
-                    return vote_type
-        
-        # Create new vote
-        query = """
-        INSERT INTO votes (user_id, post_id, comment_id, vote_type)
-        VALUES (%s, %s, %s, %s)
+    def cast(user_id, target, target_id, vote_type):
+        """
+        Apply a click on the up (1) or down (-1) arrow of a 'post' or
+        'comment': a new vote is recorded, the same vote again takes it back
+        and the opposite vote replaces it. The vote and the target's counters
+        change in one transaction.
+        Every vote write is conditional on the unique (user_id, target) key
+        and its row count tells which case applied, so the existing vote is
+        never read and concurrent clicks can't double-count.
+        Returns VoteResult(user_vote, upvotes, downvotes), with user_vote 0
+        when the vote was taken back. Raises LookupError if the target
+        doesn't exist.
+        """
+        table, column = Vote.TARGETS[target]
+        key = (user_id, target_id)
+        up = vote_type == 1
+        # Selecting the target inserts nothing when it doesn't exist, where
+        # SQLite would fail the foreign key despite INSERT OR IGNORE
+        new_vote = f"""
+        INSERT IGNORE INTO votes (user_id, {column}, vote_type)
+        SELECT %s, id, %s FROM {table} WHERE id = %s
         """
-        insert(query, (user_id, post_id, comment_id, vote_type))
-        return vote_type
+        # Each case sets the counter deltas as (upvotes, downvotes)
+        with transaction():
+            if execute(new_vote, (user_id, vote_type, target_id)):
+                user_vote, delta = vote_type, (1, 0) if up else (0, 1)
+            elif db_delete(f"DELETE FROM votes WHERE user_id = %s AND {column} = %s AND vote_type = %s",
+                           key + (vote_type,)):
+                user_vote, delta = 0, (-1, 0) if up else (0, -1)
+            elif update(f"UPDATE votes SET vote_type = %s WHERE user_id = %s AND {column} = %s",
+                        (vote_type,) + key):
+                user_vote, delta = vote_type, (1, -1) if up else (-1, 1)
+            else:
+                # No vote to insert, delete or change: the target is missing
+                raise LookupError(f"{target} {target_id} not found")
+            counts = Vote._add_counts(table, target_id, *delta)
+            if counts is None:
+                raise LookupError(f"{target} {target_id} not found")
+        return VoteResult(user_vote, counts.upvotes, counts.downvotes)
+    
+    @staticmethod
+    def _add_counts(table, target_id, upvotes, downvotes):
+        """Add to a target's counters and return the new (upvotes, downvotes) row"""
+        query = f"""
+        UPDATE {table} SET upvotes = upvotes + %s, downvotes = downvotes + %s
+        WHERE id = %s
+        """
+        params = (upvotes, downvotes, target_id)
+        clause = returning(('upvotes', 'downvotes'))
+        if clause:
+            return fetch_one(f"{query} {clause}", params, row_mode=ROWS_TUPLE)
+        # No RETURNING (MySQL, SQLite before 3.35): the UPDATE holds the row's
+        # lock until commit, so reading it back in the same transaction sees
+        # exactly our result
+        if not update(query, params):
+            return None
+        return fetch_one(f"SELECT upvotes, downvotes FROM {table} WHERE id = %s", (target_id,),
+                         row_mode=ROWS_TUPLE)
     
     @staticmethod
     def remove_vote(user_id, post_id=None, comment_id=None):
@@ -66,3 +122,39 @@ class Vote:
             query = "DELETE FROM votes WHERE user_id = %s AND comment_id = %s"
             db_delete(query, (user_id, comment_id))
         return None
+    
+    @staticmethod
+    def bulk_apply(votes):
+        """
+        Set many post votes at once, e.g. for imports and data migrations.
+        `votes` is an iterable of (user_id, post_id, vote_type) where
+        vote_type is 1, -1, or 0 to clear the vote. The affected posts'
+        upvote/downvote counters are recomputed in the same transaction.
+        Returns the number of posts touched.
+        """
+        latest = {}
+        for user_id, post_id, vote_type in votes:
+            latest[(user_id, post_id)] = vote_type
+        if not latest:
+            return 0
+        
+        delete_query = "DELETE FROM votes WHERE user_id = %s AND post_id = %s"
+        insert_query = """
+        INSERT INTO votes (user_id, post_id, comment_id, vote_type)
+        VALUES (%s, %s, NULL, %s)
+        """
+        recount_query = """
+        UPDATE posts
+        SET upvotes = (SELECT COUNT(*) FROM votes WHERE post_id = %s AND vote_type = 1),
+            downvotes = (SELECT COUNT(*) FROM votes WHERE post_id = %s AND vote_type = -1)
+        WHERE id = %s
+        """
+        post_ids = {post_id for _, post_id in latest}
+        with transaction():
+            update_many(delete_query, list(latest))
+            insert_many(insert_query, [(user_id, post_id, vote_type)
+                                       for (user_id, post_id), vote_type in latest.items()
+                                       if vote_type])
+            update_many(recount_query, [(pid, pid, pid) for pid in post_ids])
+            insert_many(insert_ignore('trending_queue', ('post_id',)), [(pid,) for pid in post_ids])
+        return len(post_ids)
@@ -0,0 +1,203 @@
+"""
+Per-request query instrumentation
+db.execute_query reports every statement here. For each request we keep the
+query count, total database time and a count per normalized statement, and
+send them back in the X-Query-Count and Server-Timing response headers.
+
+The same normalized statement running more than QUERY_N_PLUS_ONE_THRESHOLD
+times in one request is almost always a per-row lookup in a loop (N+1). It
+is logged as a warning, or raised as NPlusOneError when
+QUERY_N_PLUS_ONE_RAISE is set (the default under app.testing).
+
+Queries awaited through db_async run on pool threads in the request's
+context and are counted like any other.
+
+Statements slower than SLOW_QUERY_MS (0 disables) are also written as JSON
+lines to SLOW_QUERY_LOG, with the query plan of each distinct statement the
+first time it is slow.
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+from flask import current_app, g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', 'slow_queries.jsonl')
+SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', 5))
+
+# Frames in these files are the database layer, not the caller of a query
+_DATABASE_LAYER = {'db.py', 'db_async.py', os.path.basename(__file__)}
+
+
+class NPlusOneError(Exception):
+    """Raised in test mode when a request repeats one statement too often"""
+
+
+@lru_cache(maxsize=2048)
+def normalize(sql):
+    """
+    Reduce a statement to its shape: literals become ?, IN-lists of any
+    length collapse to (?), and whitespace is folded
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(?)', sql.replace('%s', '?'))
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryStats:
+    """Queries issued while serving one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.statements = Counter()
+        self.flagged = set()
+        # db_async pool threads report into the same request
+        self._lock = threading.Lock()
+
+    def add(self, sql, elapsed):
+        shape = normalize(sql)
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            self.statements[shape] += 1
+            return shape, self.statements[shape]
+
+    def repeated(self, threshold):
+        """Normalized statements that ran more than `threshold` times"""
+        return {shape: n for shape, n in self.statements.items() if n > threshold}
+
+
+def current_stats():
+    """QueryStats for the active request, or None outside a request"""
+    if not has_request_context():
+        return None
+    return g.get('_query_stats')
+
+
+def record(sql, elapsed):
+    """Account one executed statement (MySQL-style SQL, seconds) to the request"""
+    stats = current_stats()
+    if stats is None:
+        return
+    shape, seen = stats.add(sql, elapsed)
+
+    threshold = current_app.config.get('QUERY_N_PLUS_ONE_THRESHOLD', 10)
+    if seen > threshold and shape not in stats.flagged:
+        stats.flagged.add(shape)
+        message = f"Possible N+1: statement ran {seen} times in one request: {shape}"
+        raise_error = current_app.config.get('QUERY_N_PLUS_ONE_RAISE')
+        if raise_error is None:
+            raise_error = current_app.testing
+        if raise_error:
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+def init_app(app):
+    """Collect query stats per request and report them in response headers"""
+    app.config.setdefault('QUERY_N_PLUS_ONE_THRESHOLD', 10)
+
+    @app.before_request
+    def _start_query_stats():
+        g._query_stats = QueryStats()
+
+    @app.after_request
+    def _report_query_stats(response):
+        stats = g.get('_query_stats')
+        if stats is None:
+            return response
+        duration_ms = stats.total_time * 1000
+        response.headers['X-Query-Count'] = str(stats.count)
+        response.headers.add('Server-Timing',
+                             f'db;dur={duration_ms:.2f};desc="{stats.count} queries"')
+        return response
+
+
+_slow_logger = None
+_slow_lock = threading.Lock()
+_explained = set()
+
+
+def _get_slow_logger():
+    """JSON-lines logger for slow queries, opened on the first slow query"""
+    global _slow_logger
+    if _slow_logger is None:
+        with _slow_lock:
+            if _slow_logger is None:
+                from logging.handlers import RotatingFileHandler
+                slow_logger = logging.getLogger(f"{__name__}.slow")
+                slow_logger.setLevel(logging.INFO)
+                slow_logger.propagate = False
+                handler = RotatingFileHandler(SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+                                              backupCount=SLOW_QUERY_LOG_BACKUPS, delay=True)
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                slow_logger.addHandler(handler)
+                _slow_logger = slow_logger
+    return _slow_logger
+
+
+def _calling_method():
+    """'file:Class.method' of the nearest caller outside the database layer"""
+    frame = sys._getframe(1)
+    fallback = None
+    while frame is not None:
+        filename = os.path.normcase(frame.f_code.co_filename)
+        if os.path.basename(filename) not in _DATABASE_LAYER:
+            name = getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)
+            location = f"{os.path.basename(filename)}:{name}"
+            # Prefer the model method over the route that called it
+            if f"{os.sep}models{os.sep}" in filename:
+                return location
+            fallback = fallback or location
+        frame = frame.f_back
+    return fallback
+
+
+def _params_shape(params):
+    """Types of the bound parameters; values are left out of the log"""
+    if not params:
+        return []
+    return [type(value).__name__ for value in params]
+
+
+def log_if_slow(sql, params, elapsed):
+    """Write a statement (MySQL-style SQL, seconds) to the slow query log if it was slow"""
+    if not SLOW_QUERY_MS or elapsed * 1000 < SLOW_QUERY_MS:
+        return
+    shape = normalize(sql)
+    entry = {
+        'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'duration_ms': round(elapsed * 1000, 2),
+        'sql': shape,
+        'params': _params_shape(params),
+        'caller': _calling_method(),
+    }
+    with _slow_lock:
+        first_time = shape not in _explained
+        _explained.add(shape)
+    if first_time:
+        import db  # db imports this module
+        try:
+            entry['plan'] = db.explain(sql, params)
+        except Exception as e:
+            entry['plan_error'] = str(e)
+    logger.warning("Slow query (%.1f ms) from %s: %s", entry['duration_ms'], entry['caller'], shape)
+    _get_slow_logger().info(json.dumps(entry, default=str))
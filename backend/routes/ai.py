@@ -1,24 +1,38 @@
 """AI feature routes - REST API endpoints for AI functionality"""
-from flask import Blueprint, request, jsonify
+import asyncio
+import threading
+
+from flask import Blueprint, current_app, request, jsonify
 from auth_middleware import token_required
 from models.post import Post
 from models.comment import Comment
 from ai_service import AIService
-from config import Config
+import db_async
 
 ai_bp = Blueprint('ai', __name__, url_prefix='/api/ai')
 
-# Initialize AI service
-ai_service = AIService(
-    provider=Config.AI_PROVIDER,
-    api_key=Config.OPENAI_API_KEY,
-    model=Config.AI_MODEL
-)
+_ai_service = None
+_ai_service_lock = threading.Lock()
+
+
+def get_ai_service():
+    """Return the AI service, creating it (and importing its provider SDK) on first use"""
+    global _ai_service
+    if _ai_service is None:
+        with _ai_service_lock:
+            if _ai_service is None:
+                config = current_app.config
+                _ai_service = AIService(
+                    provider=config.get('AI_PROVIDER', 'mock'),
+                    api_key=config.get('OPENAI_API_KEY'),
+                    model=config.get('AI_MODEL', 'gpt-3.5-turbo')
+                )
+    return _ai_service
 
 
 @ai_bp.route('/answer', methods=['POST'])
 @token_required
-def get_ai_answer(current_user):
+async def get_ai_answer(current_user):
     """Get AI-generated answer for a discussion"""
     data = request.get_json()
     post_id = data.get('post_id')
@@ -26,11 +40,13 @@ def get_ai_answer(current_user):
     if not post_id:
         return jsonify({'success': False, 'error': 'Post ID required'}), 400
     
-    post = Post.get_by_id(post_id)
+    post = await db_async.run(Post.get_by_id, post_id)
     if not post:
         return jsonify({'success': False, 'error': 'Post not found'}), 404
     
-    result = ai_service.get_answer_for_discussion(
+    # Provider calls block on the network; keep them off the event loop
+    result = await asyncio.to_thread(
+        get_ai_service().get_answer_for_discussion,
         title=post.title,
         content=post.content,
         subject=post.subject
@@ -41,7 +57,7 @@ def get_ai_answer(current_user):
 
 @ai_bp.route('/moderate', methods=['POST'])
 @token_required
-def moderate_content(current_user):
+async def moderate_content(current_user):
     """Check content for spam/abuse before posting"""
     data = request.get_json()
     content = data.get('content', '')
@@ -49,14 +65,14 @@ def moderate_content(current_user):
     if not content:
         return jsonify({'success': False, 'error': 'Content required'}), 400
     
-    result = ai_service.moderate_content(content)
+    result = await asyncio.to_thread(get_ai_service().moderate_content, content)
     
     return jsonify(result)
 
 
 @ai_bp.route('/summarize', methods=['POST'])
 @token_required
-def summarize_thread(current_user):
+async def summarize_thread(current_user):
     """Generate summary of a discussion thread"""
     data = request.get_json()
     post_id = data.get('post_id')
@@ -64,14 +80,15 @@ def summarize_thread(current_user):
     if not post_id:
         return jsonify({'success': False, 'error': 'Post ID required'}), 400
     
-    post = Post.get_by_id(post_id)
+    post = await db_async.run(Post.get_by_id, post_id)
     if not post:
         return jsonify({'success': False, 'error': 'Post not found'}), 404
     
-    comments = Comment.get_by_post(post_id)
+    comments = await db_async.run(Comment.get_by_post, post_id)
     comment_texts = [c.content for c in comments]
     
-    result = ai_service.summarize_thread(
+    result = await asyncio.to_thread(
+        get_ai_service().summarize_thread,
         title=post.title,
         content=post.content,
         comments=comment_texts
@@ -82,7 +99,7 @@ def summarize_thread(current_user):
 
 @ai_bp.route('/enhance', methods=['POST'])
 @token_required
-def enhance_question(current_user):
+async def enhance_question(current_user):
     """Improve a student's question"""
     data = request.get_json()
     question = data.get('question', '')
@@ -90,6 +107,6 @@ def enhance_question(current_user):
     if not question:
         return jsonify({'success': False, 'error': 'Question required'}), 400
     
-    result = ai_service.enhance_question(question)
+    result = await asyncio.to_thread(get_ai_service().enhance_question, question)
     
     return jsonify(result)
@@ -150,7 +150,7 @@ def get_profile(user_id):
             'subject': p.subject,
             'timestamp': p.timestamp.isoformat() if p.timestamp else None,
             'score': p.score,
-            'comment_count': p.comment_count()
+            'comment_count': p.comment_count
         } for p in posts]
     }), 200
 
@@ -2,6 +2,7 @@
 from flask import Blueprint, request, jsonify
 from models.post import Post
 from models.comment import Comment
+from models.vote import Vote
 from auth_middleware import token_required
 
 comments_bp = Blueprint('comments', __name__, url_prefix='/api')
@@ -87,3 +88,31 @@ def delete_comment(current_user, comment_id):
         return jsonify({'message': 'Comment deleted successfully'}), 200
     except Exception as e:
         return jsonify({'error': 'Delete failed'}), 500
+
+
+@comments_bp.route('/comments/<int:comment_id>/vote', methods=['POST'])
+@token_required
+def vote_on_comment(current_user, comment_id):
+    """Vote on a comment (same toggle rules as posts)"""
+    data = request.get_json()
+    vote_type = data.get('vote_type')
+    
+    if vote_type not in [1, -1]:
+        return jsonify({'error': 'Invalid vote type'}), 400
+    
+    if not Comment.get_by_id(comment_id):
+        return jsonify({'error': 'Comment not found'}), 404
+    
+    try:
+        result = Vote.cast(current_user.id, 'comment', comment_id, vote_type)
+    except LookupError:
+        return jsonify({'error': 'Comment not found'}), 404
+    except Exception as e:
+        return jsonify({'error': 'Vote failed'}), 500
+    
+    return jsonify({
+        'upvotes': result.upvotes,
+        'downvotes': result.downvotes,
+        'score': result.upvotes - result.downvotes,
+        'user_vote': result.user_vote
+    }), 200
@@ -2,7 +2,7 @@
 Messages API routes - Direct messaging system
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from auth_middleware import require_auth
 from models.conversation import Conversation
 from models.message import Message
@@ -17,10 +17,13 @@ def get_conversations():
     try:
         user_id = request.user_id
         conversations = Conversation.get_user_conversations(user_id)
+        # One query each for every conversation's participants and unread count
+        participants_by_conv = Conversation.get_participants_many(conv.id for conv in conversations)
+        unread_counts = Conversation.get_unread_counts(user_id)
         
         result = []
         for conv in conversations:
-            participants = conv.get_participants()
+            participants = participants_by_conv.get(conv.id, [])
             other_user = next((p for p in participants if p.id != user_id), None)
             
             conv_data = {
@@ -33,7 +36,7 @@ def get_conversations():
                     'name': other_user.name,
                     'avatar_url': other_user.avatar_url
                 } if other_user else None,
-                'unread_count': conv.get_unread_count(user_id),
+                'unread_count': unread_counts.get(conv.id, 0),
                 'updated_at': conv.updated_at.isoformat() if conv.updated_at else None
             }
             result.append(conv_data)
@@ -47,19 +50,38 @@ def get_conversations():
 @messages_bp.route('/conversations/<int:conv_id>', methods=['GET'])
 @require_auth
 def get_conversation(conv_id):
-    """Get conversation messages"""
+    """
+    Get conversation messages, newest first
+    ?after_id= returns only messages newer than that id (for polling),
+    ?before_id= the page of history before it. ?limit= caps the page (at
+    most MESSAGES_PER_PAGE); has_more says whether more are left.
+    """
     try:
         user_id = request.user_id
-        conv = Conversation.get_by_id(conv_id)
-        
-        if not conv:
-            return jsonify({'error': 'Conversation not found'}), 404
-        
-        # Mark as read
-        conv.mark_as_read(user_id)
+        after_id = request.args.get('after_id', type=int)
+        before_id = request.args.get('before_id', type=int)
+        per_page = current_app.config['MESSAGES_PER_PAGE']
+        limit = min(max(request.args.get('limit', per_page, type=int), 1), per_page)
+        
+        if after_id is not None:
+            # Polling: one indexed query, and no write unless something arrived.
+            # The conversation isn't looked up; a missing one has no messages.
+            conv = Conversation(id=conv_id)
+            messages, has_more = conv.get_messages(limit=limit, after_id=after_id,
+                                                   before_id=before_id)
+            if messages:
+                conv.mark_as_read(user_id)
+        else:
+            conv = Conversation.get_by_id(conv_id)
+            
+            if not conv:
+                return jsonify({'error': 'Conversation not found'}), 404
+            
+            if before_id is None:
+                # Opening the conversation
+                conv.mark_as_read(user_id)
+            messages, has_more = conv.get_messages(limit=limit, before_id=before_id)
         
-        # Get messages
-        messages = conv.get_messages(limit=100)
         messages_data = [{
             'id': m.id,
             'content': m.content,
@@ -73,7 +95,8 @@ def get_conversation(conv_id):
         
         return jsonify({
             'conversation': {'id': conv.id},
-            'messages': messages_data
+            'messages': messages_data,
+            'has_more': has_more
         }), 200
         
     except Exception as e:
@@ -178,9 +201,7 @@ def get_unread_count():
     """Get total unread message count"""
     try:
         user_id = request.user_id
-        conversations = Conversation.get_user_conversations(user_id)
-        
-        total_unread = sum(conv.get_unread_count(user_id) for conv in conversations)
+        total_unread = sum(Conversation.get_unread_counts(user_id).values())
         
         return jsonify({'unread_count': total_unread}), 200
         
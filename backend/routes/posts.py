@@ -1,9 +1,10 @@
 """Post API routes - RESTful endpoints for posts"""
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from models.post import Post
 from models.vote import Vote
 from auth_middleware import token_required, get_current_user
-from db import update as db_update
+from db import transaction
+import trending
 
 posts_bp = Blueprint('posts', __name__, url_prefix='/api/posts')
 
@@ -13,16 +14,31 @@ SUBJECTS = ['Coding', 'Studies', 'General Discussion', 'Placement', 'Projects',
 
 @posts_bp.route('', methods=['GET'])
 def get_posts():
-    """Get all posts with optional filtering"""
+    """
+    Get a page of posts with optional filtering
+    ?search= runs a full-text search, sorted by relevance unless ?sort= says
+    otherwise. ?limit= sets the page size (at most POSTS_PER_PAGE); pass the
+    response's next_cursor as ?cursor= to get the next page.
+    Relevance-sorted and one- or two-letter searches only cover the newest
+    Post.SEARCH_CANDIDATES matches: `truncated` is true on their last page
+    when older matches were left out.
+    """
     search = request.args.get('search', '')
     subject = request.args.get('subject', '')
-    sort_by = request.args.get('sort', 'latest')
+    sort_by = request.args.get('sort', 'relevance' if search else 'latest')
+    per_page = current_app.config['POSTS_PER_PAGE']
+    limit = min(max(request.args.get('limit', per_page, type=int), 1), per_page)
     
-    posts = Post.get_all(
-        search=search if search else None,
-        subject=subject if subject in SUBJECTS else None,
-        sort_by=sort_by
-    )
+    try:
+        posts, next_cursor, truncated = Post.get_all(
+            search=search if search else None,
+            subject=subject if subject in SUBJECTS else None,
+            sort_by=sort_by,
+            limit=limit,
+            cursor=request.args.get('cursor') or None
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
         'posts': [{
@@ -43,8 +59,11 @@ def get_posts():
                 'branch': getattr(p.author, 'branch', ''),
                 'year': getattr(p.author, 'year', '')
             } if p.author else None,
-            'comment_count': p.comment_count()
+            'comment_count': p.comment_count,
+            'snippet': p.snippet
         } for p in posts],
+        'next_cursor': next_cursor,
+        'truncated': truncated,
         'subjects': SUBJECTS
     }), 200
 
@@ -60,9 +79,9 @@ def get_post(post_id):
     try:
         post.increment_view_count()
         
-        # Get comments
+        # Whole thread in one go; replies are already attached
         from models.comment import Comment
-        comments = Comment.get_by_post(post_id, parent_only=True)
+        comments = Comment.get_tree(post_id)
         
         def serialize_comment(c):
             return {
@@ -70,6 +89,9 @@ def get_post(post_id):
                 'content': c.content,
                 'timestamp': c.timestamp.isoformat() if c.timestamp else None,
                 'edited_at': c.edited_at.isoformat() if c.edited_at else None,
+                'upvotes': c.upvotes or 0,
+                'downvotes': c.downvotes or 0,
+                'score': (c.upvotes or 0) - (c.downvotes or 0),
                 'author': {
                     'id': c.author.id,
                     'name': c.author.name,
@@ -198,44 +220,19 @@ def vote_on_post(current_user, post_id):
         return jsonify({'error': 'Post not found'}), 404
     
     try:
-        existing_vote = Vote.get_user_vote_on_post(current_user.id, post_id)
-        
-        if existing_vote:
-            if existing_vote.vote_type == vote_type:
-                # Remove vote (toggle)
-                Vote.remove_vote(current_user.id, post_id=post_id)
-                if vote_type == 1:
-                    db_update("UPDATE posts SET upvotes = upvotes - 1 WHERE id = %s", (post_id,))
-                    post.upvotes -= 1
-                else:
-                    db_update("UPDATE posts SET downvotes = downvotes - 1 WHERE id = %s", (post_id,))
-                    post.downvotes -= 1
-            else:
-                # Change vote
-                Vote.create_or_update(current_user.id, post_id=post_id, vote_type=vote_type)
-                if existing_vote.vote_type == 1:
-                    db_update("UPDATE posts SET upvotes = upvotes - 1, downvotes = downvotes + 1 WHERE id = %s", (post_id,))
-                    post.upvotes -= 1
-                    post.downvotes += 1
-                else:
-                    db_update("UPDATE posts SET downvotes = downvotes - 1, upvotes = upvotes + 1 WHERE id = %s", (post_id,))
-                    post.downvotes -= 1
-                    post.upvotes += 1
-        else:
-            # New vote
-            Vote.create_or_update(current_user.id, post_id=post_id, vote_type=vote_type)
-            if vote_type == 1:
-                db_update("UPDATE posts SET upvotes = upvotes + 1 WHERE id = %s", (post_id,))
-                post.upvotes += 1
-            else:
-                db_update("UPDATE posts SET downvotes = downvotes + 1 WHERE id = %s", (post_id,))
-                post.downvotes += 1
+        with transaction():
+            result = Vote.cast(current_user.id, 'post', post_id, vote_type)
+            trending.touch(post_id)
         
         return jsonify({
-            'upvotes': post.upvotes,
-            'downvotes': post.downvotes,
-            'score': post.score
+            'upvotes': result.upvotes,
+            'downvotes': result.downvotes,
+            'score': result.upvotes - result.downvotes,
+            'user_vote': result.user_vote
         }), 200
         
+    except LookupError:
+        # Deleted since the check above
+        return jsonify({'error': 'Post not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -5,7 +5,7 @@ Profiles API routes - User profiles, follow/unfollow
 from flask import Blueprint, request, jsonify
 from auth_middleware import require_auth
 from models.user import User
-from db import fetch_one, insert, delete as db_delete
+from db import fetch_one
 
 profiles_bp = Blueprint('profiles', __name__, url_prefix='/api')
 
@@ -23,13 +23,6 @@ def get_user_profile(username):
         
         user = User.from_dict(user_data)
         
-        # Get follower/following counts
-        followers_query = "SELECT COUNT(*) as count FROM user_follows WHERE following_id = %s"
-        following_query = "SELECT COUNT(*) as count FROM user_follows WHERE follower_id = %s"
-        
-        followers_count = fetch_one(followers_query, (user.id,))['count']
-        following_count = fetch_one(following_query, (user.id,))['count']
-        
         profile_data = {
             'id': user.id,
             'username': user.username,
@@ -45,9 +38,9 @@ def get_user_profile(username):
             'linkedin_url': user.linkedin_url,
             'github_url': user.github_url,
             'reputation_points': user.reputation_points,
-            'followers_count': followers_count,
-            'following_count': following_count,
-            'posts_count': user.get_posts_count(),
+            'followers_count': user.followers_count,
+            'following_count': user.following_count,
+            'posts_count': user.posts_count,
             'created_at': user.created_at.isoformat() if user.created_at else None
 
 
@@ -88,6 +81,7 @@ def update_profile():
             data.get('avatar_url'),
             user_id
         ))
+        User.invalidate_cache(user_id)
         
         return jsonify({'message': 'Profile updated'}), 200
         
@@ -114,12 +108,8 @@ def follow_user(username):
         if user_id == target_id:
             return jsonify({'error': 'Cannot follow yourself'}), 400
         
-        # Insert follow (Standardize for SQLite)
-        follow_query = """
-        INSERT OR IGNORE INTO user_follows (follower_id, following_id)
-        VALUES (%s, %s)
-        """
-        insert(follow_query, (user_id, target_id))
+        # Insert follow (no-op if already following)
+        User.follow(user_id, target_id)
         
         return jsonify({'message': 'Followed successfully'}), 200
         
@@ -144,11 +134,7 @@ def unfollow_user(username):
         target_id = target_user['id']
         
         # Delete follow
-        unfollow_query = """
-        DELETE FROM user_follows
-        WHERE follower_id = %s AND following_id = %s
-        """
-        db_delete(unfollow_query, (user_id, target_id))
+        User.unfollow(user_id, target_id)
         
         return jsonify({'message': 'Unfollowed successfully'}), 200
         
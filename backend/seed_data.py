@@ -83,27 +83,34 @@ def seed_users():
     cursor = conn.cursor()
     
     print("Creating sample users...")
-    user_ids = []
-    
-    for user_data in SAMPLE_USERS:
-        password_hash = generate_password_hash('password123')
-        query = """
-        INSERT INTO users (username, name, email, password_hash, branch, year, section, bio, skills, reputation_points)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        cursor.execute(query, (
-            user_data['username'],
-            user_data['name'],
-            user_data['email'],
-            password_hash,
-            user_data['branch'],
-            user_data['year'],
-            user_data['section'],
-            user_data['bio'],
-            user_data['skills'],
-            random.randint(50, 500)
-        ))
-        user_ids.append(cursor.lastrowid)
+    
+    # Every demo user shares a password, so hash it once
+    password_hash = generate_password_hash('password123')
+    query = """
+    INSERT INTO users (username, name, email, password_hash, branch, year, section, bio, skills, reputation_points)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    cursor.executemany(query, [(
+        user_data['username'],
+        user_data['name'],
+        user_data['email'],
+        password_hash,
+        user_data['branch'],
+        user_data['year'],
+        user_data['section'],
+        user_data['bio'],
+        user_data['skills'],
+        random.randint(50, 500)
+    ) for user_data in SAMPLE_USERS])
+    
+    # Multi-row inserts don't report every id, so look them up in seed order
+    emails = [user_data['email'] for user_data in SAMPLE_USERS]
+    cursor.execute(
+        f"SELECT id, email FROM users WHERE email IN ({', '.join(['%s'] * len(emails))})",
+        emails
+    )
+    ids_by_email = {email: user_id for user_id, email in cursor.fetchall()}
+    user_ids = [ids_by_email[email] for email in emails]
     
     conn.commit()
     cursor.close()
@@ -118,25 +125,27 @@ def seed_posts(user_ids):
     cursor = conn.cursor()
     
     print("Creating sample posts...")
-    post_ids = []
-    
-    for post_data in SAMPLE_POSTS:
-        author_id = random.choice(user_ids)
-        query = """
-        INSERT INTO posts (user_id, title, content, branch, category, is_question, score, timestamp)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        cursor.execute(query, (
-            author_id,
-            post_data['title'],
-            post_data['content'],
-            post_data['branch'],
-            post_data['category'],
-            post_data['is_question'],
-            random.randint(5, 50),
-            datetime.now() - timedelta(days=random.randint(1, 30))
-        ))
-        post_ids.append(cursor.lastrowid)
+    
+    query = """
+    INSERT INTO posts (user_id, title, content, branch, category, is_question, timestamp)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """
+    cursor.executemany(query, [(
+        random.choice(user_ids),
+        post_data['title'],
+        post_data['content'],
+        post_data['branch'],
+        post_data['category'],
+        post_data['is_question'],
+        datetime.now() - timedelta(days=random.randint(1, 30))
+    ) for post_data in SAMPLE_POSTS])
+    
+    titles = [post_data['title'] for post_data in SAMPLE_POSTS]
+    cursor.execute(
+        f"SELECT id FROM posts WHERE title IN ({', '.join(['%s'] * len(titles))}) ORDER BY id",
+        titles
+    )
+    post_ids = [row[0] for row in cursor.fetchall()]
     
     conn.commit()
     cursor.close()
@@ -152,8 +161,10 @@ def seed_conversations(user_ids):
     
     print("Creating sample conversations...")
     
-    # Create 3 conversations
+    # Create 3 conversations; participants and messages are batched below
     conversations_created = 0
+    participants = []
+    messages = []
     for i in range(3):
         user1 = user_ids[i]
         user2 = user_ids[i + 1]
@@ -162,9 +173,8 @@ def seed_conversations(user_ids):
         cursor.execute("INSERT INTO conversations (type) VALUES ('direct')")
         conv_id = cursor.lastrowid
         
-        # Add participants
-        cursor.execute("INSERT INTO conversation_participants (conversation_id, user_id) VALUES (%s, %s)", (conv_id, user1))
-        cursor.execute("INSERT INTO conversation_participants (conversation_id, user_id) VALUES (%s, %s)", (conv_id, user2))
+        participants.append((conv_id, user1))
+        participants.append((conv_id, user2))
         
         # Add 3-5 messages
         num_messages = random.randint(3, 5)
@@ -172,14 +182,19 @@ def seed_conversations(user_ids):
             sender = user1 if j % 2 == 0 else user2
             content = f"Sample message {j + 1} in conversation {i + 1}"
             timestamp = datetime.now() - timedelta(minutes=random.randint(10, 1000))
-            
-            cursor.execute(
-                "INSERT INTO messages (conversation_id, sender_id, content, created_at) VALUES (%s, %s, %s, %s)",
-                (conv_id, sender, content, timestamp)
-            )
+            messages.append((conv_id, sender, content, timestamp))
         
         conversations_created += 1
     
+    cursor.executemany(
+        "INSERT INTO conversation_participants (conversation_id, user_id) VALUES (%s, %s)",
+        participants
+    )
+    cursor.executemany(
+        "INSERT INTO messages (conversation_id, sender_id, content, created_at) VALUES (%s, %s, %s, %s)",
+        messages
+    )
+    
     conn.commit()
     cursor.close()
     conn.close()
@@ -192,23 +207,21 @@ def seed_follows(user_ids):
     cursor = conn.cursor()
     
     print("Creating follow relationships...")
-    follows_created = 0
+    follows = []
     
     # Each user follows 2-3 others
     for user_id in user_ids:
         num_follows = random.randint(2, 3)
         others = [uid for uid in user_ids if uid != user_id]
         to_follow = random.sample(others, min(num_follows, len(others)))
-        
-        for following_id in to_follow:
-            try:
-                cursor.execute(
-                    "INSERT INTO user_follows (follower_id, following_id) VALUES (%s, %s)",
-                    (user_id, following_id)
-                )
-                follows_created += 1
-            except:
-                pass  # Skip duplicates
+        follows.extend((user_id, following_id) for following_id in to_follow)
+    
+    # IGNORE skips follows that already exist from an earlier run
+    cursor.executemany(
+        "INSERT IGNORE INTO user_follows (follower_id, following_id) VALUES (%s, %s)",
+        follows
+    )
+    follows_created = cursor.rowcount
     
     conn.commit()
     cursor.close()
@@ -0,0 +1,184 @@
+"""
+SQL dialect layer for MySQL and SQLite
+Statements are written once in MySQL style (%s placeholders, NOW(),
+INSERT IGNORE) and compiled for the active backend on first use.
+Compiled statements are cached, so the hot path does no string work.
+"""
+
+import re
+import sqlite3
+from collections import namedtuple
+from functools import lru_cache
+
+SQLITE = 'sqlite'
+MYSQL = 'mysql'
+
+# RETURNING needs SQLite 3.35+; the library Python links decides, not the
+# Python version
+SQLITE_RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+
+# A statement compiled for one dialect, plus its leading keyword
+# ('SELECT', 'INSERT', 'UPDATE', ...) so callers need not re-parse it
+Statement = namedtuple('Statement', ['sql', 'kind'])
+
+_NOW = re.compile(r'\bNOW\(\)', re.IGNORECASE)
+_INSERT_IGNORE = re.compile(r'\bINSERT\s+IGNORE\s+INTO\b', re.IGNORECASE)
+_INSERT_OR_IGNORE = re.compile(r'\bINSERT\s+OR\s+IGNORE\s+INTO\b', re.IGNORECASE)
+_KIND = re.compile(r'\s*\(*\s*([A-Za-z]+)')
+
+
+@lru_cache(maxsize=2048)
+def compile_statement(sql, dialect):
+    """Translate a MySQL-style statement to `dialect` (cached per statement)"""
+    match = _KIND.match(sql)
+    kind = match.group(1).upper() if match else ''
+
+    if dialect == SQLITE:
+        sql = sql.replace('%s', '?')
+        sql = _NOW.sub('CURRENT_TIMESTAMP', sql)
+        sql = _INSERT_IGNORE.sub('INSERT OR IGNORE INTO', sql)
+    else:
+        sql = _INSERT_OR_IGNORE.sub('INSERT IGNORE INTO', sql)
+
+    return Statement(sql, kind)
+
+
+def now(dialect):
+    """SQL expression for the current timestamp"""
+    return 'CURRENT_TIMESTAMP' if dialect == SQLITE else 'NOW()'
+
+
+def seconds_ago(seconds, dialect):
+    """SQL expression for the timestamp `seconds` before now"""
+    seconds = int(seconds)
+    if dialect == SQLITE:
+        return f"datetime('now', '-{seconds} seconds')"
+    return f"NOW() - INTERVAL {seconds} SECOND"
+
+
+def returning(columns, dialect):
+    """
+    RETURNING clause handing back `columns` of the rows a write changed, or
+    None where there is no RETURNING (MySQL, and SQLite before 3.35)
+    """
+    if dialect == SQLITE and SQLITE_RETURNING:
+        return f"RETURNING {', '.join(columns)}"
+    return None
+
+
+def _placeholders(columns):
+    return ', '.join(['%s'] * len(columns))
+
+
+@lru_cache(maxsize=256)
+def insert_ignore(table, columns, dialect):
+    """INSERT that silently skips rows violating a unique/primary key"""
+    verb = 'INSERT OR IGNORE INTO' if dialect == SQLITE else 'INSERT IGNORE INTO'
+    return (f"{verb} {table} ({', '.join(columns)}) "
+            f"VALUES ({_placeholders(columns)})")
+
+
+@lru_cache(maxsize=256)
+def upsert(table, columns, conflict, update, dialect):
+    """
+    INSERT that updates `update` columns with the incoming values when a row
+    with the same `conflict` key already exists. SQLite needs the conflict
+    columns to match a unique index; MySQL uses whichever key is violated.
+    """
+    insert_sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+                  f"VALUES ({_placeholders(columns)})")
+    if dialect == SQLITE:
+        if not update:
+            return f"{insert_sql} ON CONFLICT ({', '.join(conflict)}) DO NOTHING"
+        assignments = ', '.join(f"{col} = excluded.{col}" for col in update)
+        return f"{insert_sql} ON CONFLICT ({', '.join(conflict)}) DO UPDATE SET {assignments}"
+
+    # MySQL: a no-op assignment keeps duplicates from raising
+    update = update or conflict[:1]
+    assignments = ', '.join(f"{col} = VALUES({col})" for col in update)
+    return f"{insert_sql} ON DUPLICATE KEY UPDATE {assignments}"
+
+
+_WORD = re.compile(r'\w+')
+
+# Shortest word matched as a prefix: shorter ones expand to most of the index
+# (posts_fts indexes prefixes of this length, see migration 0008)
+FULL_TEXT_MIN_PREFIX = 3
+
+# SQL fragments for a ranked full-text search; see full_text_search()
+FullTextSearch = namedtuple('FullTextSearch', ['join', 'join_params', 'condition', 'relevance',
+                                               'relevance_params', 'more_matches'])
+
+
+def full_text_query(text, dialect):
+    """
+    Turn what a user typed into a full-text query in which every word must
+    match. The last word also matches as a prefix (so it works while typing)
+    once it has FULL_TEXT_MIN_PREFIX characters; the others are whole words.
+    Operators in the input are dropped. Returns None if `text` has no words.
+    """
+    words = _WORD.findall(text or '')
+    if not words:
+        return None
+    if dialect == SQLITE:
+        terms = [f'"{word}"' for word in words]
+    else:
+        terms = [f'+{word}' for word in words]
+    if len(words[-1]) >= FULL_TEXT_MIN_PREFIX:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+@lru_cache(maxsize=64)
+def full_text_search(table, alias, columns, weights, dialect, candidates=None):
+    """
+    Fragments searching `columns` of `table` (aliased `alias` in the query)
+    with a full_text_query() string, ranked by relevance (higher is better).
+    SQLite uses the FTS5 table <table>_fts over the same columns and ranks
+    by BM25 with per-column `weights`; MySQL uses the FULLTEXT index on the
+    columns and its own relevance score (weights are ignored).
+    With `candidates`, the join itself does the search and only ranks the
+    newest `candidates` matches, so a common word costs the same as a rare
+    one; the condition is then empty, and `more_matches` is a statement
+    (taking the query string once) that returns a row if the cap left
+    older matches out. It is None without `candidates`.
+    The join takes the query string `join_params` times, then the condition
+    takes it once and the relevance expression `relevance_params` times, in
+    that order of appearance.
+    """
+    if dialect == SQLITE:
+        fts = f"{table}_fts"
+        weight_args = ', '.join(str(weight) for weight in weights)
+        rank = f"-bm25({fts}, {weight_args})"
+        if candidates:
+            return FullTextSearch(
+                join=f"""JOIN (
+                    SELECT rowid AS id, {rank} AS relevance FROM {fts}
+                    WHERE {fts} MATCH %s ORDER BY rowid DESC LIMIT {int(candidates)}
+                ) fts ON fts.id = {alias}.id""",
+                join_params=1, condition='', relevance='fts.relevance', relevance_params=0,
+                more_matches=f"SELECT 1 FROM {fts} WHERE {fts} MATCH %s "
+                             f"LIMIT 1 OFFSET {int(candidates)}",
+            )
+        return FullTextSearch(
+            join=f"JOIN {fts} ON {fts}.rowid = {alias}.id",
+            join_params=0,
+            condition=f"{fts} MATCH %s",
+            relevance=rank,
+            relevance_params=0,
+            more_matches=None,
+        )
+
+    if candidates:
+        match = f"MATCH({', '.join(columns)}) AGAINST (%s IN BOOLEAN MODE)"
+        return FullTextSearch(
+            join=f"""JOIN (
+                SELECT id, {match} AS relevance FROM {table}
+                WHERE {match} ORDER BY id DESC LIMIT {int(candidates)}
+            ) fts ON fts.id = {alias}.id""",
+            join_params=2, condition='', relevance='fts.relevance', relevance_params=0,
+            more_matches=f"SELECT 1 FROM {table} WHERE {match} LIMIT 1 OFFSET {int(candidates)}",
+        )
+    match = f"MATCH({', '.join(f'{alias}.{col}' for col in columns)}) AGAINST (%s IN BOOLEAN MODE)"
+    return FullTextSearch(join='', join_params=0, condition=match, relevance=match,
+                          relevance_params=1, more_matches=None)
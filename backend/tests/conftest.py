@@ -0,0 +1,49 @@
+"""
+Test setup: the app under test runs against a throwaway SQLite database.
+The environment is set before the backend modules are imported, because
+they read their settings at import time.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_workdir = tempfile.mkdtemp(prefix='forum-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_workdir, 'forum.db')}"
+os.environ['SLOW_QUERY_MS'] = '0'
+os.environ['TRENDING_REFRESH_SECONDS'] = '0'
+os.environ.pop('DATABASE_REPLICA_URLS', None)
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app
+    # Also makes query_log raise on N+1 patterns instead of logging them
+    flask_app.testing = True
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def register(app):
+    """Register a user; returns (auth headers, user id)"""
+    client = app.test_client()
+
+    def _register(username):
+        response = client.post('/api/auth/register', json={
+            'username': username, 'name': username.title(), 'email': f'{username}@example.com',
+            'password': 'secret123', 'branch': 'CSE', 'year': '2',
+        })
+        assert response.status_code == 201, response.get_json()
+        data = response.get_json()
+        return {'Authorization': f"Bearer {data['token']}"}, data['user']['id']
+    return _register
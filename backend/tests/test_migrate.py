@@ -0,0 +1,15 @@
+"""Startup must not go on with a schema the migrations failed to bring up to date"""
+
+import pytest
+
+
+def test_failed_migration_stops_startup(app, monkeypatch):
+    import db
+    import migrate
+
+    def fail(conn, dialect, target=None):
+        raise RuntimeError('migration 0002 failed')
+
+    monkeypatch.setattr(migrate, 'migrate', fail)
+    with pytest.raises(RuntimeError, match='migration 0002 failed'):
+        db.init_sqlite_db()
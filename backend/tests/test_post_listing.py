@@ -0,0 +1,160 @@
+"""Post listing: keyset pages of /api/posts and capped searches"""
+
+import base64
+import json
+
+import pytest
+
+import db
+import trending
+from models.post import Post
+
+
+@pytest.fixture(scope='module')
+def author(register):
+    headers, _ = register('lister')
+    return headers
+
+
+def create_posts(client, headers, count, content):
+    ids = []
+    for i in range(count):
+        response = client.post('/api/posts', json={'title': f'Post {i}', 'content': content,
+                                                   'subject': 'Coding'}, headers=headers)
+        assert response.status_code == 201, response.get_json()
+        ids.append(response.get_json()['post']['id'])
+    return ids
+
+
+def all_pages(client, **params):
+    """Follow next_cursor to the end; returns (post ids, each page's response)"""
+    ids, pages, cursor = [], [], None
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        response = client.get('/api/posts', query_string=query)
+        assert response.status_code == 200, response.get_json()
+        data = response.get_json()
+        pages.append(data)
+        ids += [post['id'] for post in data['posts']]
+        cursor = data['next_cursor']
+        if not cursor:
+            return ids, pages
+
+
+def test_capped_search_marks_its_last_page_truncated(client, author, monkeypatch):
+    created = create_posts(client, author, 7, 'zephyrcap notes')
+    monkeypatch.setattr(Post, 'SEARCH_CANDIDATES', 5)
+
+    for search in ('zephyrcap', 'zephyrcap not'):
+        ids, pages = all_pages(client, search=search, limit=2)
+        # Relevance ranks the newest five matches only
+        assert sorted(ids) == sorted(created[-5:])
+        assert [page['truncated'] for page in pages] == [False, False, True]
+
+    # Sorting by date pages through every match
+    ids, pages = all_pages(client, search='zephyrcap', sort='latest', limit=2)
+    assert ids == created[::-1]
+    assert not any(page['truncated'] for page in pages)
+
+    monkeypatch.setattr(Post, 'SEARCH_CANDIDATES', 7)
+    ids, pages = all_pages(client, search='zephyrcap', limit=2)
+    assert sorted(ids) == sorted(created)
+    assert not any(page['truncated'] for page in pages)
+
+
+# Posts of their own subject, so other tests' posts stay out of the listing.
+# Scores, comment counts and search ranks repeat, so pages break ties on id.
+SUBJECT = 'Hackathons'
+SCORES = [2, 0, 1, 1, 0, 2, -1, 1, 0]
+COMMENTS = [0, 2, 1, 1, 0, 2, 3, 0, 1]
+
+
+@pytest.fixture(scope='module')
+def listing(app, register):
+    client = app.test_client()
+    author, _ = register('pager')
+    voters = [register(f'pager{i}')[0] for i in range(3)]
+    ids = []
+    for i, (score, comments) in enumerate(zip(SCORES, COMMENTS)):
+        response = client.post('/api/posts', json={
+            'title': f'Keyset {i}', 'content': ' '.join(['quasarpage'] * (i % 3 + 1)),
+            'subject': SUBJECT}, headers=author)
+        post_id = response.get_json()['post']['id']
+        ids.append(post_id)
+        for voter in voters[:abs(score)]:
+            client.post(f'/api/posts/{post_id}/vote', json={'vote_type': 1 if score > 0 else -1},
+                        headers=voter)
+        for _ in range(comments):
+            client.post(f'/api/posts/{post_id}/comments', json={'content': 'Same here'},
+                        headers=author)
+    trending.refresh_all()
+    rows = db.fetch_all("SELECT score, comment_count FROM posts WHERE subject = %s ORDER BY id",
+                        (SUBJECT,))
+    assert [(row['score'], row['comment_count']) for row in rows] == list(zip(SCORES, COMMENTS))
+    return ids
+
+
+def expected_order(sort_by):
+    """The listing's order, read straight from the tables"""
+    if sort_by == 'trending':
+        query = """SELECT post_id AS id FROM post_trending WHERE subject = %s
+                   ORDER BY hot_score DESC, post_id DESC"""
+    else:
+        column = {'latest': 'timestamp', 'top': 'score', 'most_active': 'comment_count'}[sort_by]
+        query = f"SELECT id FROM posts WHERE subject = %s ORDER BY {column} DESC, id DESC"
+    return [row['id'] for row in db.fetch_all(query, (SUBJECT,))]
+
+
+@pytest.mark.parametrize('sort_by', ['latest', 'top', 'most_active', 'trending'])
+def test_pages_cover_each_sort_without_duplicates_or_gaps(client, listing, sort_by):
+    ids, pages = all_pages(client, subject=SUBJECT, sort=sort_by, limit=2)
+    assert len(pages) == 5
+    assert all(len(page['posts']) == 2 for page in pages[:-1])
+    assert ids == expected_order(sort_by)
+    assert sorted(ids) == sorted(listing)
+
+    response = client.get('/api/posts', query_string={'subject': SUBJECT, 'sort': sort_by})
+    assert [post['id'] for post in response.get_json()['posts']] == ids
+
+
+def test_relevance_pages_cover_every_match(client, listing):
+    ids, pages = all_pages(client, search='quasarpage', limit=2)
+    assert len(pages) == 5
+    assert len(ids) == len(set(ids))
+    assert sorted(ids) == sorted(listing)
+
+    response = client.get('/api/posts', query_string={'search': 'quasarpage'})
+    assert [post['id'] for post in response.get_json()['posts']] == ids
+
+
+def cursor(*payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('sort_by, bad_cursor', [
+    ('latest', 'not a cursor!'),
+    ('latest', cursor()[:-1] + '*'),
+    ('latest', 'bm90IGpzb24'),                              # base64 of 'not json'
+    ('latest', cursor('latest', '2024-01-01 00:00:00')),    # too short
+    ('latest', cursor('top', '2024-01-01 00:00:00', 5)),    # another sort's
+    ('top', cursor('latest', 3, 5)),
+    ('latest', cursor('latest', 3, 5)),                     # key of the wrong type
+    ('top', cursor('top', '3', 5)),
+    ('top', cursor('top', True, 5)),
+    ('top', cursor('top', 3, '5')),
+    ('top', cursor('top', 3, False)),
+    ('top', cursor('top', None, 5)),
+])
+def test_malformed_or_tampered_cursors_are_rejected(client, sort_by, bad_cursor):
+    response = client.get('/api/posts', query_string={'sort': sort_by, 'cursor': bad_cursor})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor'}
+
+
+def test_next_cursor_is_only_valid_for_its_own_sort(client, listing):
+    response = client.get('/api/posts', query_string={'subject': SUBJECT, 'sort': 'top', 'limit': 2})
+    next_cursor = response.get_json()['next_cursor']
+    for other in ('latest', 'most_active', 'trending'):
+        response = client.get('/api/posts', query_string={'subject': SUBJECT, 'sort': other,
+                                                          'cursor': next_cursor})
+        assert response.status_code == 400
@@ -0,0 +1,91 @@
+"""X-Query-Count must account for every query a request runs, async views included"""
+
+
+def query_count(response):
+    return int(response.headers['X-Query-Count'])
+
+
+def test_sync_route_counts_queries(client):
+    response = client.get('/api/posts')
+    assert response.status_code == 200
+    assert query_count(response) == 1
+
+
+def test_message_routes_count_queries(client, register):
+    alice, _ = register('alice')
+    bob, bob_id = register('bob')
+    response = client.post('/api/conversations/start', json={'user_id': bob_id}, headers=alice)
+    conversation_id = response.get_json()['conversation_id']
+    client.post(f'/api/conversations/{conversation_id}/messages', json={'content': 'hi'},
+                headers=bob)
+
+    # Conversations, then their participants and unread counts
+    response = client.get('/api/conversations', headers=alice)
+    assert response.status_code == 200
+    assert query_count(response) == 3
+
+    response = client.get(f'/api/conversations/{conversation_id}', headers=alice)
+    assert response.status_code == 200
+    assert query_count(response) > 0
+
+    response = client.get('/api/messages/unread-count', headers=alice)
+    assert response.get_json() == {'unread_count': 0}
+    assert query_count(response) > 0
+
+
+def test_message_route_queries_do_not_grow_with_conversations(client, register):
+    erin, _ = register('erin')
+    for i in range(11):
+        other, other_id = register(f'friend{i}')
+        response = client.post('/api/conversations/start', json={'user_id': other_id}, headers=erin)
+        conversation_id = response.get_json()['conversation_id']
+        client.post(f'/api/conversations/{conversation_id}/messages', json={'content': 'hi'},
+                    headers=other)
+
+    response = client.get('/api/conversations', headers=erin)
+    assert response.status_code == 200, response.get_json()
+    conversations = response.get_json()['conversations']
+    assert len(conversations) == 11
+    assert all(conv['unread_count'] == 1 for conv in conversations)
+    assert {conv['other_user']['username'] for conv in conversations} == {
+        f'friend{i}' for i in range(11)}
+    assert query_count(response) == 3
+
+    response = client.get('/api/messages/unread-count', headers=erin)
+    assert response.get_json() == {'unread_count': 11}
+    assert query_count(response) == 1
+
+
+def _create_post(client, headers, title='Graphs', content='Shortest paths'):
+    response = client.post('/api/posts', json={'title': title, 'content': content,
+                                               'subject': 'Coding'}, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['post']['id']
+
+
+def test_async_route_counts_pool_thread_queries(client, register):
+    carol, _ = register('carol')
+    post_id = _create_post(client, carol)
+
+    # The first request also loads carol into the user cache
+    client.post('/api/ai/summarize', json={'post_id': post_id}, headers=carol)
+    # The post, then its comments, both awaited through db_async
+    response = client.post('/api/ai/summarize', json={'post_id': post_id}, headers=carol)
+    assert response.status_code == 200
+    assert query_count(response) == 2
+
+
+def test_async_views_reuse_the_request_connection(client, register, monkeypatch):
+    import db
+    dave, _ = register('dave')
+    post_id = _create_post(client, dave)
+    client.post('/api/ai/summarize', json={'post_id': post_id}, headers=dave)
+
+    opened = []
+    open_connection = db._open_sqlite_connection
+    monkeypatch.setattr(db, '_open_sqlite_connection',
+                        lambda *args, **kwargs: opened.append(args) or open_connection(*args, **kwargs))
+    for _ in range(3):
+        response = client.post('/api/ai/summarize', json={'post_id': post_id}, headers=dave)
+        assert response.status_code == 200
+    assert opened == []
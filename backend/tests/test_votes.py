@@ -0,0 +1,110 @@
+"""Voting on posts and comments: the votes row and the counters after each click"""
+
+import itertools
+
+import pytest
+
+import db
+import sql_dialect
+
+_names = itertools.count()
+
+
+@pytest.fixture(params=[True, False], ids=['returning', 'update-select'])
+def counters_path(request, monkeypatch):
+    """Run with RETURNING and with the UPDATE + SELECT fallback of old SQLite"""
+    if request.param and not sql_dialect.SQLITE_RETURNING:
+        pytest.skip('SQLite before 3.35 has no RETURNING')
+    monkeypatch.setattr(sql_dialect, 'SQLITE_RETURNING', request.param)
+
+
+@pytest.fixture
+def users(register):
+    """Register n users with names unique across the test session"""
+    return lambda n: [register(f'voter{next(_names)}') for _ in range(n)]
+
+
+@pytest.fixture
+def target(request, client, users):
+    """A post or a comment to vote on: (vote URL, votes column, table, id)"""
+    (author, _), = users(1)
+    response = client.post('/api/posts', json={'title': 'Heaps', 'content': 'Binary heaps',
+                                               'subject': 'Coding'}, headers=author)
+    post_id = response.get_json()['post']['id']
+    if request.param == 'post':
+        return f'/api/posts/{post_id}/vote', 'post_id', 'posts', post_id
+    response = client.post(f'/api/posts/{post_id}/comments', json={'content': 'Use heapq'},
+                           headers=author)
+    comment_id = response.get_json()['comment']['id']
+    return f'/api/comments/{comment_id}/vote', 'comment_id', 'comments', comment_id
+
+
+def stored(target, user_id):
+    """(the user's stored vote_type or None, upvotes, downvotes) of the target"""
+    _, column, table, target_id = target
+    vote = db.fetch_one(f"SELECT vote_type FROM votes WHERE user_id = %s AND {column} = %s",
+                        (user_id, target_id))
+    counts = db.fetch_one(f"SELECT upvotes, downvotes FROM {table} WHERE id = %s", (target_id,))
+    return vote['vote_type'] if vote else None, counts['upvotes'], counts['downvotes']
+
+
+def vote(client, target, headers, vote_type):
+    response = client.post(target[0], json={'vote_type': vote_type}, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    data = response.get_json()
+    assert data['score'] == data['upvotes'] - data['downvotes']
+    return data['user_vote'], data['upvotes'], data['downvotes']
+
+
+@pytest.mark.parametrize('target', ['post', 'comment'], indirect=True)
+def test_cast_repeat_and_flip(client, users, target, counters_path):
+    (alice, alice_id), (bob, bob_id) = users(2)
+
+    # New vote
+    assert vote(client, target, alice, 1) == (1, 1, 0)
+    assert stored(target, alice_id) == (1, 1, 0)
+
+    # The same vote again takes it back
+    assert vote(client, target, alice, 1) == (0, 0, 0)
+    assert stored(target, alice_id) == (None, 0, 0)
+
+    # The opposite vote replaces it
+    assert vote(client, target, alice, 1) == (1, 1, 0)
+    assert vote(client, target, alice, -1) == (-1, 0, 1)
+    assert stored(target, alice_id) == (-1, 0, 1)
+
+    # Other users' votes add up
+    assert vote(client, target, bob, -1) == (-1, 0, 2)
+    assert vote(client, target, alice, 1) == (1, 1, 1)
+    assert stored(target, alice_id) == (1, 1, 1)
+    assert stored(target, bob_id) == (-1, 1, 1)
+
+    assert vote(client, target, bob, -1) == (0, 1, 0)
+    assert stored(target, bob_id) == (None, 1, 0)
+
+
+@pytest.mark.parametrize('target', ['post', 'comment'], indirect=True)
+def test_invalid_vote_type_is_rejected(client, users, target):
+    (alice, alice_id), = users(1)
+    response = client.post(target[0], json={'vote_type': 2}, headers=alice)
+    assert response.status_code == 400
+    assert stored(target, alice_id) == (None, 0, 0)
+
+
+def test_vote_on_missing_target_is_404(client, users):
+    (alice, _), = users(1)
+    for url in ('/api/posts/999999/vote', '/api/comments/999999/vote'):
+        response = client.post(url, json={'vote_type': 1}, headers=alice)
+        assert response.status_code == 404
+
+
+def test_vote_on_target_deleted_after_the_check_is_404(client, users, monkeypatch):
+    from models.comment import Comment
+    from models.post import Post
+    (alice, _), = users(1)
+    # The routes' existence checks pass, then the vote finds nothing
+    monkeypatch.setattr(Post, 'get_by_id', staticmethod(lambda post_id: Post(id=post_id)))
+    monkeypatch.setattr(Comment, 'get_by_id', staticmethod(lambda comment_id: Comment(id=comment_id)))
+    for url in ('/api/posts/999999/vote', '/api/comments/999999/vote'):
+        response = client.post(url, json={'vote_type': 1}, headers=alice)
+        assert response.status_code == 404, response.get_json()
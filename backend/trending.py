@@ -0,0 +1,162 @@
+"""
+Trending ranking
+post_trending keeps a precomputed hot score per post, which the 'trending'
+sort of Post.get_all reads in index order. A post's score is
+
+    hot = sign(e) * log10(max(|e|, 1)) + (posted - EPOCH) / TRENDING_DECAY_SECONDS
+    e   = (upvotes - downvotes) + TRENDING_COMMENT_WEIGHT * comments in the
+          last TRENDING_WINDOW_SECONDS
+
+so every TRENDING_DECAY_SECONDS of age weigh as much as ten times the
+engagement. Age is folded in as a bonus for newer posts rather than a
+penalty that grows with time, so scores don't go stale as posts get older:
+a post is only rescored when something changes it (votes, comments, edits),
+or when a comment counted as recent drops out of the window (expires_at).
+
+Writes that change a post call touch() inside their transaction, which
+queues the post in trending_queue; a background thread in every worker
+process rescores queued and expired posts every TRENDING_REFRESH_SECONDS.
+`python maintenance.py trending` does the same from the command line.
+"""
+
+import calendar
+import logging
+import math
+import os
+import threading
+from datetime import datetime, timedelta
+
+from background import ProcessThread
+from db import (fetch_all, insert_many, update, insert_ignore, upsert, seconds_ago,
+                transaction, ROWS_TUPLE)
+from models.rows import decode_timestamp
+
+logger = logging.getLogger(__name__)
+
+TRENDING_DECAY_SECONDS = float(os.environ.get('TRENDING_DECAY_SECONDS', 45000))
+TRENDING_COMMENT_WEIGHT = float(os.environ.get('TRENDING_COMMENT_WEIGHT', 2))
+TRENDING_WINDOW_SECONDS = int(os.environ.get('TRENDING_WINDOW_SECONDS', 24 * 3600))
+TRENDING_REFRESH_SECONDS = float(os.environ.get('TRENDING_REFRESH_SECONDS', 30))
+TRENDING_BATCH_SIZE = int(os.environ.get('TRENDING_BATCH_SIZE', 500))
+
+# Start of the hot score's time axis (any fixed point works)
+EPOCH = calendar.timegm((2024, 1, 1, 0, 0, 0))
+
+
+def hot_score(score, recent_comments, posted):
+    """Hot score of a post with vote `score`, created at `posted` (naive UTC datetime)"""
+    engagement = score + TRENDING_COMMENT_WEIGHT * recent_comments
+    order = math.log10(max(abs(engagement), 1))
+    sign = (engagement > 0) - (engagement < 0)
+    age = calendar.timegm(posted.timetuple()) - EPOCH if isinstance(posted, datetime) else 0
+    return sign * order + age / TRENDING_DECAY_SECONDS
+
+
+def touch(post_id):
+    """Queue a post for rescoring; call it in the transaction that changed the post"""
+    update(insert_ignore('trending_queue', ('post_id',)), (post_id,))
+
+
+def refresh(post_ids):
+    """Recompute the hot scores of `post_ids` now; returns how many posts were scored"""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return 0
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    query = f"""
+    SELECT p.id, p.subject, p.timestamp, p.upvotes, p.downvotes,
+           COUNT(c.id) AS recent_comments, MIN(c.timestamp) AS oldest_recent
+    FROM posts p
+    LEFT JOIN comments c ON c.post_id = p.id AND c.timestamp >= {seconds_ago(TRENDING_WINDOW_SECONDS)}
+    WHERE p.id IN ({placeholders})
+    GROUP BY p.id, p.subject, p.timestamp, p.upvotes, p.downvotes
+    """
+    window = timedelta(seconds=TRENDING_WINDOW_SECONDS)
+    scores = []
+    for row in fetch_all(query, tuple(post_ids), row_mode=ROWS_TUPLE):
+        oldest = decode_timestamp(row.oldest_recent)
+        expires_at = None
+        if isinstance(oldest, datetime):
+            expires_at = (oldest + window).strftime('%Y-%m-%d %H:%M:%S')
+        score = (row.upvotes or 0) - (row.downvotes or 0)
+        scores.append((row.id, row.subject,
+                       hot_score(score, row.recent_comments, decode_timestamp(row.timestamp)),
+                       expires_at))
+    query = upsert('post_trending', ('post_id', 'subject', 'hot_score', 'expires_at'),
+                   ('post_id',), ('subject', 'hot_score', 'expires_at'))
+    insert_many(query, scores)
+    return len(scores)
+
+
+def refresh_pending(batch_size=TRENDING_BATCH_SIZE):
+    """
+    Rescore one batch of queued posts and posts whose recent comments
+    expired. Returns how many posts were rescored.
+    """
+    queued = fetch_all("SELECT post_id FROM trending_queue ORDER BY post_id LIMIT %s",
+                       (batch_size,), row_mode=ROWS_TUPLE)
+    expired = fetch_all(f"""
+    SELECT post_id FROM post_trending
+    WHERE expires_at <= {seconds_ago(0)}
+    ORDER BY expires_at
+    LIMIT %s
+    """, (batch_size,), row_mode=ROWS_TUPLE)
+    post_ids = {row.post_id for row in queued} | {row.post_id for row in expired}
+    if not post_ids:
+        return 0
+    with transaction():
+        # Dequeue before reading the posts: this holds the queue rows (the
+        # write lock on SQLite), so a concurrent touch() either committed
+        # before the read below or queues its post again afterwards
+        if queued:
+            placeholders = ', '.join(['%s'] * len(queued))
+            update(f"DELETE FROM trending_queue WHERE post_id IN ({placeholders})",
+                   tuple(row.post_id for row in queued))
+        return refresh(sorted(post_ids))
+
+
+def refresh_all(batch_size=TRENDING_BATCH_SIZE):
+    """Rescore every post (e.g. after changing the weights); returns the number scored"""
+    total = 0
+    last_id = 0
+    while True:
+        rows = fetch_all("SELECT id FROM posts WHERE id > %s ORDER BY id LIMIT %s",
+                         (last_id, batch_size), row_mode=ROWS_TUPLE)
+        if not rows:
+            return total
+        with transaction():
+            total += refresh([row.id for row in rows])
+        last_id = rows[-1].id
+
+
+_stop = threading.Event()
+
+
+def _run_refresher():
+    while not _stop.wait(TRENDING_REFRESH_SECONDS):
+        try:
+            # Drain the backlog, then sleep until the next round
+            while refresh_pending() >= TRENDING_BATCH_SIZE and not _stop.is_set():
+                pass
+        except Exception:
+            logger.exception("Trending refresh failed")
+
+
+# Background refresher, one per worker process
+_refresher = ProcessThread(_run_refresher, 'trending-refresher')
+
+
+def start_refresher():
+    """Start this process's refresher thread unless it's running or disabled"""
+    if TRENDING_REFRESH_SECONDS <= 0:
+        return
+    _refresher.start()
+
+
+def init_app(app):
+    """
+    Run the refresher in every process serving `app`. It starts with the
+    first request rather than here, so a pre-forking server's master
+    doesn't own the thread.
+    """
+    app.before_request(start_refresher)
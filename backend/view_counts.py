@@ -0,0 +1,133 @@
+"""
+Buffered post view counts
+Opening a post used to write posts.view_count on every read, which made the
+busiest read endpoint queue for the SQLite write lock. Views are now counted
+in memory per worker process and added to posts in one batched UPDATE every
+VIEW_FLUSH_SECONDS, or sooner once VIEW_FLUSH_EVENTS views are pending.
+
+A background thread does the writes, so requests only take an in-process
+lock. The buffer is flushed when the worker exits (gunicorn.conf.py's
+worker_exit hook, and atexit otherwise); views still pending when a process
+is killed are lost, which is fine for a view counter.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+
+from background import ProcessThread
+from db import update, transaction
+
+logger = logging.getLogger(__name__)
+
+VIEW_FLUSH_SECONDS = float(os.environ.get('VIEW_FLUSH_SECONDS', 5))
+VIEW_FLUSH_EVENTS = int(os.environ.get('VIEW_FLUSH_EVENTS', 1000))
+# Posts per UPDATE statement
+VIEW_FLUSH_BATCH_SIZE = int(os.environ.get('VIEW_FLUSH_BATCH_SIZE', 500))
+
+_pending = Counter()
+_pending_views = 0
+_lock = threading.Lock()
+# Serializes flushes (background thread vs. shutdown)
+_flush_lock = threading.Lock()
+_wake = threading.Event()
+_stats = {'flushes': 0, 'flushed_views': 0, 'failed_flushes': 0}
+
+
+def record(post_id, views=1):
+    """Count views of a post; written to the database by the next flush"""
+    global _pending_views
+    with _lock:
+        _pending[post_id] += views
+        _pending_views += views
+        full = _pending_views >= VIEW_FLUSH_EVENTS
+    if VIEW_FLUSH_SECONDS <= 0:
+        # Buffering disabled: write through
+        flush()
+        return
+    _flusher.start()
+    if full:
+        _wake.set()
+
+
+def pending(post_id):
+    """Views of a post counted here but not flushed yet"""
+    with _lock:
+        return _pending.get(post_id, 0)
+
+
+def _add_views(batch):
+    """One UPDATE adding each post's views: view_count + CASE id WHEN ... END"""
+    cases = ' '.join(['WHEN %s THEN %s'] * len(batch))
+    placeholders = ', '.join(['%s'] * len(batch))
+    query = f"""
+    UPDATE posts SET view_count = view_count + CASE id {cases} ELSE 0 END
+    WHERE id IN ({placeholders})
+    """
+    params = [value for item in batch for value in item] + [post_id for post_id, _ in batch]
+    update(query, tuple(params))
+
+
+def flush():
+    """Write all pending views; returns how many were written"""
+    global _pending_views
+    with _flush_lock:
+        with _lock:
+            views = sorted(_pending.items())
+            _pending.clear()
+            _pending_views = 0
+        if not views:
+            return 0
+        try:
+            with transaction():
+                for start in range(0, len(views), VIEW_FLUSH_BATCH_SIZE):
+                    _add_views(views[start:start + VIEW_FLUSH_BATCH_SIZE])
+        except Exception:
+            # Put them back for the next attempt
+            with _lock:
+                for post_id, count in views:
+                    _pending[post_id] += count
+                    _pending_views += count
+            _stats['failed_flushes'] += 1
+            raise
+        total = sum(count for _, count in views)
+        _stats['flushes'] += 1
+        _stats['flushed_views'] += total
+        return total
+
+
+def stats():
+    """Buffer metrics: pending views/posts and flush totals for this process"""
+    with _lock:
+        current = {'pending_views': _pending_views, 'pending_posts': len(_pending)}
+    current.update(_stats)
+    return current
+
+
+def _run_flusher():
+    while True:
+        _wake.wait(VIEW_FLUSH_SECONDS)
+        _wake.clear()
+        try:
+            flush()
+        except Exception:
+            logger.exception("View count flush failed")
+
+
+# Background flusher, one per worker process
+_flusher = ProcessThread(_run_flusher, 'view-count-flusher')
+
+
+def flush_on_exit():
+    """Flush before the process exits; never raises"""
+    try:
+        flushed = flush()
+        if flushed:
+            logger.info("Flushed %d pending post views on exit", flushed)
+    except Exception:
+        logger.exception("View count flush on exit failed")
+
+
+atexit.register(flush_on_exit)
@@ -3,6 +3,13 @@ import { Link } from 'react-router-dom';
 import { postsAPI } from '../utils/api';
 import { useAuth } from '../context/AuthContext';
 
+// Search snippets mark matched words as <mark>word</mark>; render those
+// as highlights and everything else as plain text
+const highlight = (snippet) =>
+    snippet.split(/<mark>(.*?)<\/mark>/g).map((part, i) =>
+        i % 2 === 1 ? <mark key={i} className="px-0">{part}</mark> : part
+    );
+
 const PostCard = ({ post }) => {
     const { user } = useAuth();
     const [score, setScore] = useState(post.score || 0);
@@ -19,8 +26,8 @@ const PostCard = ({ post }) => {
         try {
             const response = await postsAPI.vote(post.id, voteType);
             setScore(response.data.score);
-            // Toggle: if same vote clicked again, it removes the vote
-            setUserVote(userVote === voteType ? 0 : voteType);
+            // Clicking the same vote again removes it; the server says which
+            setUserVote(response.data.user_vote);
         } catch (error) {
             console.error('Error voting:', error);
         } finally {
@@ -65,7 +72,7 @@ const PostCard = ({ post }) => {
                                 WebkitBoxOrient: 'vertical',
                                 overflow: 'hidden'
                             }}>
-                                {post.content}
+                                {post.snippet ? highlight(post.snippet) : post.content}
                             </p>
                         </Link>
 
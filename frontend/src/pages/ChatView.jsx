@@ -9,30 +9,48 @@ const ChatView = () => {
     const [newMessage, setNewMessage] = useState('');
     const [loading, setLoading] = useState(true);
     const [sending, setSending] = useState(false);
+    const [hasOlder, setHasOlder] = useState(false);
+    const [loadingOlder, setLoadingOlder] = useState(false);
     const { user } = useAuth();
     const navigate = useNavigate();
     const messagesEndRef = useRef(null);
+    // Newest message id we have; polls only ask for what came after it
+    const lastIdRef = useRef(null);
 
     useEffect(() => {
         if (conversationId) {
+            setMessages([]);
+            lastIdRef.current = null;
             fetchMessages();
-            const interval = setInterval(fetchMessages, 3000); // Poll every 3 seconds
+            const interval = setInterval(fetchNewMessages, 3000); // Poll every 3 seconds
             return () => clearInterval(interval);
         }
     }, [conversationId]);
 
+    // Follow new messages, but not older history being loaded above
+    const lastMessageId = messages.length ? messages[messages.length - 1].id : null;
     useEffect(() => {
         scrollToBottom();
-    }, [messages]);
+    }, [lastMessageId]);
 
     const scrollToBottom = () => {
         messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
     };
 
+    // The API returns newest first; the chat shows oldest first
+    const appendMessages = (newest) => {
+        const fresh = newest.filter((m) => lastIdRef.current === null || m.id > lastIdRef.current).reverse();
+        if (fresh.length === 0) return;
+        lastIdRef.current = fresh[fresh.length - 1].id;
+        setMessages((current) => [...current, ...fresh]);
+    };
+
     const fetchMessages = async () => {
         try {
             const response = await messagesAPI.getConversation(conversationId);
-            setMessages(response.data.messages.reverse());
+            appendMessages(response.data.messages);
+            if (lastIdRef.current === null) lastIdRef.current = 0; // Empty so far: poll from the start
+            setHasOlder(response.data.has_more);
             setLoading(false);
         } catch (error) {
             console.error('Error fetching messages:', error);
@@ -40,6 +58,34 @@ const ChatView = () => {
         }
     };
 
+    const fetchNewMessages = async () => {
+        if (lastIdRef.current === null) return fetchMessages();
+        try {
+            let more = true;
+            while (more) {
+                const response = await messagesAPI.getConversation(conversationId, { after_id: lastIdRef.current });
+                appendMessages(response.data.messages);
+                more = response.data.has_more && response.data.messages.length > 0;
+            }
+        } catch (error) {
+            console.error('Error fetching messages:', error);
+        }
+    };
+
+    const fetchOlderMessages = async () => {
+        if (loadingOlder || messages.length === 0) return;
+        setLoadingOlder(true);
+        try {
+            const response = await messagesAPI.getConversation(conversationId, { before_id: messages[0].id });
+            setMessages((current) => [...response.data.messages.reverse(), ...current]);
+            setHasOlder(response.data.has_more);
+        } catch (error) {
+            console.error('Error fetching messages:', error);
+        } finally {
+            setLoadingOlder(false);
+        }
+    };
+
     const handleSend = async (e) => {
         e.preventDefault();
         if (!newMessage.trim()) return;
@@ -48,7 +94,7 @@ const ChatView = () => {
         try {
             await messagesAPI.sendMessage(conversationId, newMessage);
             setNewMessage('');
-            await fetchMessages();
+            await fetchNewMessages();
         } catch (error) {
             console.error('Error sending message:', error);
         }
@@ -96,6 +142,17 @@ const ChatView = () => {
                                 </div>
                             ) : (
                                 <div>
+                                    {hasOlder && (
+                                        <div className="text-center mb-3">
+                                            <button
+                                                className="btn btn-sm btn-outline-secondary"
+                                                onClick={fetchOlderMessages}
+                                                disabled={loadingOlder}
+                                            >
+                                                {loadingOlder ? 'Loading...' : 'Load earlier messages'}
+                                            </button>
+                                        </div>
+                                    )}
                                     {messages.map((msg) => {
                                         const isOwn = msg.sender_id === user.id;
                                         return (
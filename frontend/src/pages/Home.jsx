@@ -7,6 +7,9 @@ import { useAuth } from '../context/AuthContext';
 const Home = () => {
     const [posts, setPosts] = useState([]);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [truncated, setTruncated] = useState(false);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [search, setSearch] = useState('');
     const [subject, setSubject] = useState('');
     const [sortBy, setSortBy] = useState('latest');
@@ -48,6 +51,8 @@ const Home = () => {
         try {
             const response = await postsAPI.getAll({ search, subject, sort: sortBy });
             setPosts(response.data.posts);
+            setNextCursor(response.data.next_cursor);
+            setTruncated(response.data.truncated);
         } catch (error) {
             console.error('Error fetching posts:', error);
         } finally {
@@ -55,13 +60,32 @@ const Home = () => {
         }
     };
 
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const response = await postsAPI.getAll({ search, subject, sort: sortBy, cursor: nextCursor });
+            setPosts(prev => [...prev, ...response.data.posts]);
+            setNextCursor(response.data.next_cursor);
+            setTruncated(response.data.truncated);
+        } catch (error) {
+            console.error('Error fetching posts:', error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         fetchPosts();
     }, [sortBy, subject]);
 
     const handleSearch = (e) => {
         e.preventDefault();
-        fetchPosts();
+        // Searches are ranked by relevance first; changing sortBy refetches
+        if (search && sortBy !== 'relevance') {
+            setSortBy('relevance');
+        } else {
+            fetchPosts();
+        }
     };
 
     return (
@@ -84,12 +108,26 @@ const Home = () => {
 
                             <h6 className="fw-bold text-uppercase text-muted small mb-3">Sort By</h6>
                             <div className="nav flex-column mb-4 nav-pills">
+                                {search && (
+                                    <button
+                                        className={`nav-link text-start ${sortBy === 'relevance' ? 'active bg-primary-subtle text-primary fw-bold' : 'text-secondary'}`}
+                                        onClick={() => setSortBy('relevance')}
+                                    >
+                                        <i className="bi bi-search me-2"></i> Best Match
+                                    </button>
+                                )}
                                 <button
                                     className={`nav-link text-start ${sortBy === 'latest' ? 'active bg-primary-subtle text-primary fw-bold' : 'text-secondary'}`}
                                     onClick={() => setSortBy('latest')}
                                 >
                                     <i className="bi bi-clock me-2"></i> Latest
                                 </button>
+                                <button
+                                    className={`nav-link text-start ${sortBy === 'trending' ? 'active bg-primary-subtle text-primary fw-bold' : 'text-secondary'}`}
+                                    onClick={() => setSortBy('trending')}
+                                >
+                                    <i className="bi bi-lightning-charge me-2"></i> Trending
+                                </button>
                                 <button
                                     className={`nav-link text-start ${sortBy === 'top' ? 'active bg-primary-subtle text-primary fw-bold' : 'text-secondary'}`}
                                     onClick={() => setSortBy('top')}
@@ -173,7 +211,25 @@ const Home = () => {
                             )}
                         </div>
                     ) : (
-                        posts.map((post) => <PostCard key={post.id} post={post} />)
+                        <>
+                            {posts.map((post) => <PostCard key={post.id} post={post} />)}
+                            {nextCursor && (
+                                <div className="text-center py-3">
+                                    <button
+                                        onClick={loadMore}
+                                        className="btn btn-outline-primary rounded-pill px-4"
+                                        disabled={loadingMore}
+                                    >
+                                        {loadingMore ? 'Loading...' : 'Load more'}
+                                    </button>
+                                </div>
+                            )}
+                            {!nextCursor && truncated && (
+                                <p className="text-center text-muted small py-3">
+                                    Only the most recent matches are shown. Add more words to find older discussions.
+                                </p>
+                            )}
+                        </>
                     )}
                 </div>
 
@@ -74,12 +74,13 @@ export const commentsAPI = {
     create: (postId, data) => api.post(`/posts/${postId}/comments`, data),
     update: (id, data) => api.put(`/comments/${id}`, data),
     delete: (id) => api.delete(`/comments/${id}`),
+    vote: (id, voteType) => api.post(`/comments/${id}/vote`, { vote_type: voteType }),
 };
 
 // Messages API
 export const messagesAPI = {
     getConversations: () => api.get('/conversations'),
-    getConversation: (id) => api.get(`/conversations/${id}`),
+    getConversation: (id, params) => api.get(`/conversations/${id}`, { params }),
     startConversation: (userId) => api.post('/conversations/start', { user_id: userId }),
     sendMessage: (convId, content) => api.post(`/conversations/${convId}/messages`, { content }),
     getUnreadCount: () => api.get('/messages/unread-count'),